@@ -1,23 +1,47 @@
-from typing import TypedDict, Annotated, Sequence
+from typing import TypedDict, Annotated, Sequence, List, Optional, AsyncIterator, Tuple
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
 from langchain_anthropic import ChatAnthropic
 from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import ToolNode
+from langgraph.types import StreamWriter
+from langchain_core.runnables import RunnableConfig
+import asyncio
 import json
+import operator
+import time
 from tools import ResearchTool, CRMTool, EmailTool
+from database import UnitOfWork
+from email_stream import EmailStreamParser
+from domains import normalize_domain
+from cache import llm_cache
+from hedging import HedgingPolicy
+from rate_limit import LLMRateLimiter
+from fake_llm import FakeEmailChatModel
+from singleflight import agent_flights, run_with_lease
+import metrics
+from tracing import traced_run, trace_node, current_trace
 from config import get_settings
 
 settings = get_settings()
 
 
+def _take_latest(current: str, update: str) -> str:
+    return update
+
+
 # Define the state
+# Nodes return partial updates; the reducers let parallel branches write
+# messages and next_step in the same step.
 class AgentState(TypedDict):
-    messages: Annotated[Sequence[BaseMessage], "The messages in the conversation"]
+    messages: Annotated[Sequence[BaseMessage], operator.add]
     company_domain: str
+    refresh_research: bool
+    bypass_llm_cache: bool
+    llm_cache_hit: bool
     research_data: dict
     lead_data: dict
     email_data: dict
-    next_step: str
+    next_step: Annotated[str, _take_latest]
 
 
 # Initialize tools
@@ -28,39 +52,86 @@ email_tool = EmailTool()
 tools = [research_tool, crm_tool, email_tool]
 
 # Initialize LLM with Claude
-llm = ChatAnthropic(
-    model="claude-3-haiku-20240307",
-    temperature=0.7,
-    anthropic_api_key=settings.anthropic_api_key
+def create_llm():
+    """Build the chat model selected by LLM_PROVIDER"""
+    if settings.llm_provider == "fake":
+        return FakeEmailChatModel(
+            latency=settings.fake_llm_latency,
+            body_words=settings.fake_llm_body_words
+        )
+    if not settings.anthropic_api_key:
+        raise ValueError("ANTHROPIC_API_KEY is required when LLM_PROVIDER=anthropic")
+    return ChatAnthropic(
+        model="claude-3-haiku-20240307",
+        temperature=0.7,
+        anthropic_api_key=settings.anthropic_api_key,
+        # llm_limiter owns retries; SDK retries would hide 429s from its back-off
+        max_retries=0
+    )
+
+
+llm = create_llm()
+llm_with_tools = llm.bind_tools(tools) if settings.llm_provider != "fake" else llm
+
+# Hedged requests and a hard deadline for email generation
+llm_hedging = HedgingPolicy(
+    enabled=settings.llm_hedge_enabled,
+    percentile=settings.llm_hedge_percentile,
+    initial_delay=settings.llm_hedge_initial_delay,
+    min_delay=settings.llm_hedge_min_delay,
+    max_delay=settings.llm_hedge_max_delay,
+    window=settings.llm_hedge_window,
+    min_samples=settings.llm_hedge_min_samples,
+    timeout=settings.llm_timeout_seconds
+)
+
+# Shared RPM/TPM limiter with adaptive concurrency for every LLM call
+llm_limiter = LLMRateLimiter(
+    requests_per_minute=settings.llm_requests_per_minute,
+    tokens_per_minute=settings.llm_tokens_per_minute,
+    max_concurrency=settings.llm_max_concurrency,
+    min_concurrency=settings.llm_min_concurrency,
+    max_retries=settings.llm_max_retries,
+    retry_base_delay=settings.llm_retry_base_delay,
+    retry_max_delay=settings.llm_retry_max_delay
 )
-llm_with_tools = llm.bind_tools(tools)
+
+
+def _unit_of_work(config: RunnableConfig) -> Optional[UnitOfWork]:
+    return config.get("configurable", {}).get("unit_of_work")
 
 
 # Define agent nodes
-async def research_node(state: AgentState) -> AgentState:
+async def research_node(state: AgentState) -> dict:
     """Research the company"""
     print(f"🔍 Researching company: {state['company_domain']}")
     
     company_domain = state["company_domain"]
-    research_result = await research_tool._arun(company_domain)
-    research_data = json.loads(research_result)
-    
-    state["research_data"] = research_data
-    state["messages"].append(
-        AIMessage(content=f"Research completed for {company_domain}. Found: {research_data.get('company_name', 'Unknown')}")
+    research_data, cache_hit = await research_tool.research(
+        company_domain,
+        refresh=state.get("refresh_research", False)
     )
-    state["next_step"] = "save_to_crm"
+    trace = current_trace()
+    if trace is not None:
+        trace.research_cache_hit = cache_hit
     
-    return state
+    return {
+        "research_data": research_data,
+        "messages": [
+            AIMessage(content=f"Research completed for {company_domain}. Found: {research_data.get('company_name', 'Unknown')}")
+        ],
+        "next_step": "save_to_crm"
+    }
 
 
-async def save_to_crm_node(state: AgentState) -> AgentState:
+async def save_to_crm_node(state: AgentState, config: RunnableConfig) -> dict:
     """Save lead to CRM"""
     print("💾 Saving lead to CRM")
     
     research_data = state["research_data"]
     
     crm_result = await crm_tool._arun(
+        unit_of_work=_unit_of_work(config),
         company_domain=state["company_domain"],
         company_name=research_data.get("company_name", ""),
         industry=research_data.get("industry", ""),
@@ -69,24 +140,22 @@ async def save_to_crm_node(state: AgentState) -> AgentState:
     )
     
     lead_data = json.loads(crm_result)
-    state["lead_data"] = lead_data
-    state["messages"].append(
-        AIMessage(content=f"Lead saved to CRM with ID: {lead_data.get('lead_id')}")
-    )
-    state["next_step"] = "generate_email"
+    if lead_data.get("status") == "staged":
+        # Inside a run the lead has no id yet: send_email writes it with the email
+        message = f"Lead staged for {lead_data.get('company_domain')}; it is saved with the email"
+    else:
+        message = f"Lead saved to CRM with ID: {lead_data.get('lead_id')}"
     
-    return state
+    return {
+        "lead_data": lead_data,
+        "messages": [AIMessage(content=message)],
+        "next_step": "generate_email"
+    }
 
 
-async def generate_email_node(state: AgentState) -> AgentState:
-    """Generate personalized email using LLM"""
-    print("✉️ Generating personalized email")
-    
-    research_data = state["research_data"]
-    company_name = research_data.get("company_name", "the company")
-    
-    # Create prompt for email generation
-    email_prompt = f"""You are Wasiu Ibrahim, writing a professional B2B outreach email about AI/automation solutions based on the research below.
+def build_email_prompt(research_data: dict) -> str:
+    """Build the email generation prompt from research data"""
+    return f"""You are Wasiu Ibrahim, writing a professional B2B outreach email about AI/automation solutions based on the research below.
 
 COMPANY RESEARCH:
 - Company: {research_data.get('company_name', 'Unknown')}
@@ -142,19 +211,34 @@ CRITICAL FORMATTING:
 - MUST end with: "Best regards,\\n\\nWasiu Ibrahim"
 - Write plain text with no quotation marks
 - Professional, executive-level tone throughout"""
+
+
+def extract_email_json(content: str) -> dict:
+    """Extract the JSON object from a completion, with or without code fences"""
+    if "```json" in content:
+        content = content.split("```json")[1].split("```")[0].strip()
+    elif "```" in content:
+        content = content.split("```")[1].split("```")[0].strip()
     
-    response = await llm.ainvoke([HumanMessage(content=email_prompt)])
+    return json.loads(content)
+
+
+def fallback_email(research_data: dict) -> dict:
+    """Template email used when the LLM output is unusable or too slow"""
+    company_name = research_data.get("company_name", "the company")
+    
+    return {
+        "subject": f"Strategic Partnership Discussion - {company_name}",
+        "body": f"Hi {company_name},\n\nI have been following {company_name}'s progress in the {research_data.get('industry', 'technology')} sector and wanted to reach out regarding potential collaboration opportunities.\n\nWe specialize in implementing AI and automation solutions that help companies achieve measurable improvements in operational efficiency and scalability. Based on {company_name}'s current market position, I believe there may be strategic value in exploring how these capabilities could support your growth objectives.\n\nWould you be available for a brief conversation to discuss this further?\n\nBest regards,\n\nWasiu Ibrahim"
+    }
+
+
+def parse_email_response(content: str, research_data: dict) -> dict:
+    """Parse the LLM completion into a cleaned email, falling back to a template"""
+    company_name = research_data.get("company_name", "the company")
     
-    # Parse the email content
     try:
-        # Try to extract JSON from the response
-        content = response.content
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
-        
-        email_content = json.loads(content)
+        email_content = extract_email_json(content)
         
         # Ensure proper formatting with full signature
         if "body" in email_content:
@@ -187,21 +271,130 @@ CRITICAL FORMATTING:
     except Exception as e:
         print(f"Error parsing email JSON: {e}")
         # Fallback if JSON parsing fails
-        email_content = {
-            "subject": f"Strategic Partnership Discussion - {company_name}",
-            "body": f"Hi {company_name},\n\nI have been following {company_name}'s progress in the {research_data.get('industry', 'technology')} sector and wanted to reach out regarding potential collaboration opportunities.\n\nWe specialize in implementing AI and automation solutions that help companies achieve measurable improvements in operational efficiency and scalability. Based on {company_name}'s current market position, I believe there may be strategic value in exploring how these capabilities could support your growth objectives.\n\nWould you be available for a brief conversation to discuss this further?\n\nBest regards,\n\nWasiu Ibrahim"
-        }
+        metrics.EMAIL_FALLBACKS.labels(reason="parse_error").inc()
+        email_content = fallback_email(research_data)
     
-    state["email_data"] = email_content
-    state["messages"].append(
-        AIMessage(content=f"Email generated: {email_content.get('subject')}")
+    return email_content
+
+
+def _chunk_text(chunk) -> str:
+    content = chunk.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") for block in content if isinstance(block, dict)
     )
-    state["next_step"] = "send_email"
+
+
+async def _stream_email_completion(
+    messages: list,
+    writer: StreamWriter,
+    estimated_tokens: int
+) -> str:
+    """Stream the completion, pushing subject/body text deltas to the graph stream"""
+    parser = EmailStreamParser()
+    parts = []
+    usage = None
+    started = time.perf_counter()
     
-    return state
+    async for chunk in llm_limiter.stream(lambda: llm.astream(messages), estimated_tokens):
+        if chunk.usage_metadata:
+            usage = chunk.usage_metadata
+        text = _chunk_text(chunk)
+        if not text:
+            continue
+        parts.append(text)
+        for field, delta in parser.feed(text):
+            writer({"type": "email_token", "field": field, "delta": delta})
+    
+    _record_llm_call("stream", time.perf_counter() - started, usage)
+    return "".join(parts)
+
+
+def _record_llm_call(mode: str, seconds: float, usage: Optional[dict]) -> None:
+    metrics.observe_llm_call(mode, seconds, usage)
+    trace = current_trace()
+    if trace is not None:
+        trace.add_usage(usage)
 
 
-async def send_email_node(state: AgentState) -> AgentState:
+def _is_cacheable(content: str) -> bool:
+    """Only cache completions that parse, so a bad answer is not replayed"""
+    try:
+        extract_email_json(content)
+        return True
+    except Exception:
+        return False
+
+
+async def generate_email_node(
+    state: AgentState,
+    config: RunnableConfig,
+    writer: StreamWriter
+) -> dict:
+    """Generate personalized email using LLM"""
+    print("✉️ Generating personalized email")
+    
+    research_data = state["research_data"]
+    prompt = build_email_prompt(research_data)
+    messages = [HumanMessage(content=prompt)]
+    stream_tokens = config.get("configurable", {}).get("stream_email_tokens")
+    
+    use_cache = settings.llm_cache_enabled and not state.get("bypass_llm_cache", False)
+    cache_key = llm_cache.key(llm.model, llm.temperature, prompt)
+    content = await llm_cache.get(cache_key) if use_cache else None
+    cache_hit = content is not None
+    # Rough budget for the token bucket: ~4 characters per input token
+    estimated_tokens = len(prompt) // 4 + settings.llm_output_token_estimate
+    
+    if cache_hit:
+        metrics.LLM_REQUESTS.labels(outcome="cache_hit").inc()
+        if stream_tokens:
+            for field, delta in EmailStreamParser().feed(content):
+                writer({"type": "email_token", "field": field, "delta": delta})
+    else:
+        try:
+            if stream_tokens:
+                content = await asyncio.wait_for(
+                    _stream_email_completion(messages, writer, estimated_tokens),
+                    timeout=settings.llm_timeout_seconds
+                )
+            else:
+                started = time.perf_counter()
+                response = await llm_hedging.ainvoke(
+                    lambda: llm_limiter.run(lambda: llm.ainvoke(messages), estimated_tokens),
+                    can_hedge=lambda: llm_limiter.waiting == 0
+                )
+                _record_llm_call("invoke", time.perf_counter() - started, response.usage_metadata)
+                content = response.content
+            metrics.LLM_REQUESTS.labels(outcome="success").inc()
+        except asyncio.TimeoutError:
+            print(f"⏱️ LLM did not answer within {settings.llm_timeout_seconds}s, using template email")
+            metrics.LLM_REQUESTS.labels(outcome="timeout").inc()
+            content = None
+        except Exception:
+            metrics.LLM_REQUESTS.labels(outcome="error").inc()
+            raise
+    
+    if content is None:
+        metrics.EMAIL_FALLBACKS.labels(reason="timeout").inc()
+        email_content = fallback_email(research_data)
+    else:
+        if use_cache and not cache_hit and _is_cacheable(content):
+            await llm_cache.set(cache_key, llm.model, content)
+        email_content = parse_email_response(content, research_data)
+    
+    return {
+        "email_data": email_content,
+        "llm_cache_hit": cache_hit,
+        "messages": [
+            AIMessage(content=f"Email generated: {email_content.get('subject')}")
+        ],
+        "next_step": "send_email"
+    }
+
+
+async def send_email_node(state: AgentState, config: RunnableConfig) -> dict:
     """Save and mock-send the email"""
     print("📤 Sending email")
     
@@ -211,16 +404,24 @@ async def send_email_node(state: AgentState) -> AgentState:
     email_result = await email_tool._arun(
         lead_id=lead_id,
         subject=email_data.get("subject", ""),
-        body=email_data.get("body", "")
+        body=email_data.get("body", ""),
+        unit_of_work=_unit_of_work(config)
     )
     
     email_result_data = json.loads(email_result)
-    state["messages"].append(
-        AIMessage(content=f"Email sent successfully! Email ID: {email_result_data.get('email_id')}")
-    )
-    state["next_step"] = "end"
+    update = {}
+    unit_of_work = _unit_of_work(config)
+    if unit_of_work is not None and unit_of_work.lead_result is not None:
+        # A lead staged in the run's unit of work is written with the email
+        update["lead_data"] = {**state["lead_data"], **unit_of_work.lead_result}
     
-    return state
+    return {
+        **update,
+        "messages": [
+            AIMessage(content=f"Email sent successfully! Email ID: {email_result_data.get('email_id')}")
+        ],
+        "next_step": "end"
+    }
 
 
 def route_next_step(state: AgentState) -> str:
@@ -239,18 +440,37 @@ def route_next_step(state: AgentState) -> str:
         return "research"
 
 
+def _instrumented(name: str, node):
+    """Node wrapped with Prometheus timing and per-run trace spans"""
+    return metrics.instrument_node(name, trace_node(name, node))
+
+
 # Build the graph
-def create_agent_graph():
+def create_agent_graph(parallel: bool = False):
+    """
+    Build the SDR workflow. The sequential graph runs
+    research → save_to_crm → generate_email → send_email; the parallel one
+    fans out to save_to_crm and generate_email after research (both only
+    need research_data) and joins them before send_email.
+    """
     workflow = StateGraph(AgentState)
     
     # Add nodes
-    workflow.add_node("research", research_node)
-    workflow.add_node("save_to_crm", save_to_crm_node)
-    workflow.add_node("generate_email", generate_email_node)
-    workflow.add_node("send_email", send_email_node)
+    workflow.add_node("research", _instrumented("research", research_node))
+    workflow.add_node("save_to_crm", _instrumented("save_to_crm", save_to_crm_node))
+    workflow.add_node("generate_email", _instrumented("generate_email", generate_email_node))
+    workflow.add_node("send_email", _instrumented("send_email", send_email_node))
     
     # Add edges
     workflow.set_entry_point("research")
+    
+    if parallel:
+        workflow.add_edge("research", "save_to_crm")
+        workflow.add_edge("research", "generate_email")
+        workflow.add_edge(["save_to_crm", "generate_email"], "send_email")
+        workflow.add_edge("send_email", END)
+        return workflow.compile()
+    
     workflow.add_conditional_edges(
         "research",
         route_next_step,
@@ -287,32 +507,224 @@ def create_agent_graph():
 
 
 # Create the agent
-agent_graph = create_agent_graph()
+agent_graph = create_agent_graph(parallel=settings.agent_parallel_steps)
 
 
-async def run_sdr_agent(company_domain: str) -> dict:
-    """Run the SDR agent for a given company domain"""
-    initial_state = AgentState(
+def _initial_state(
+    company_domain: str,
+    refresh_research: bool = False,
+    bypass_llm_cache: bool = False
+) -> AgentState:
+    return AgentState(
         messages=[HumanMessage(content=f"Research and create outreach for {company_domain}")],
         company_domain=company_domain,
+        refresh_research=refresh_research,
+        bypass_llm_cache=bypass_llm_cache,
+        llm_cache_hit=False,
         research_data={},
         lead_data={},
         email_data={},
         next_step="research"
     )
+
+
+def _build_result(company_domain: str, final_state: dict, trace=None) -> dict:
+    if trace is not None:
+        trace.llm_cache_hit = final_state.get("llm_cache_hit", False)
+    return {
+        "run_id": trace.run_id if trace is not None else None,
+        "company_domain": company_domain,
+        "research": final_state["research_data"],
+        "lead": final_state["lead_data"],
+        "email": final_state["email_data"],
+        "llm_cache_hit": final_state.get("llm_cache_hit", False),
+        "status": "completed"
+    }
+
+
+async def run_sdr_agent(
+    company_domain: str,
+    refresh_research: bool = False,
+    bypass_llm_cache: bool = False
+) -> dict:
+    """
+    Run the SDR agent for a given company domain.
+    Concurrent calls for the same normalized domain and flags share a single
+    execution (and, with SINGLE_FLIGHT_DISTRIBUTED, a single execution across
+    workers).
+    """
+    company_domain = normalize_domain(company_domain) or company_domain.strip()
+    key = _flight_key(company_domain, refresh_research, bypass_llm_cache)
+    return await _shared_run(
+        key, lambda: _execute_sdr_agent(company_domain, refresh_research, bypass_llm_cache)
+    )
+
+
+def _flight_key(company_domain: str, refresh_research: bool, bypass_llm_cache: bool) -> str:
+    # A refresh or cache bypass must not be answered by a run that uses the caches
+    return f"{company_domain}|refresh={int(refresh_research)}|bypass_llm_cache={int(bypass_llm_cache)}"
+
+
+async def _shared_run(key: str, fn) -> dict:
+    """Run `fn` once per key across concurrent callers (and workers, if distributed)"""
+    async def execute() -> dict:
+        if settings.single_flight_distributed:
+            return await run_with_lease(key, fn)
+        return await fn()
+    
+    return await agent_flights.do(key, execute)
+
+
+async def _execute_sdr_agent(
+    company_domain: str,
+    refresh_research: bool,
+    bypass_llm_cache: bool
+) -> dict:
+    initial_state = _initial_state(company_domain, refresh_research, bypass_llm_cache)
     
     print(f"🤖 Starting SDR Agent for {company_domain}")
     print("=" * 50)
     
-    final_state = await agent_graph.ainvoke(initial_state)
+    # The run's lead and email are written together by the CRM writer
+    with traced_run(company_domain) as trace:
+        final_state = await agent_graph.ainvoke(
+            initial_state,
+            {"configurable": {"unit_of_work": UnitOfWork()}}
+        )
+        result = _build_result(company_domain, final_state, trace)
     
     print("=" * 50)
     print("✅ Agent workflow completed!")
     
-    return {
-        "company_domain": company_domain,
-        "research": final_state["research_data"],
-        "lead": final_state["lead_data"],
-        "email": final_state["email_data"],
-        "status": "completed"
-    }
+    return result
+
+
+async def stream_sdr_agent(
+    company_domain: str,
+    stream_tokens: bool = False,
+    refresh_research: bool = False,
+    bypass_llm_cache: bool = False
+) -> AsyncIterator[Tuple[str, dict]]:
+    """
+    Run the SDR agent and yield (node, partial_state) as each node finishes,
+    followed by ("complete", result) once the workflow ends.
+    With stream_tokens, ("email_token", {"field", "delta"}) events are also
+    yielded while the email is being generated; the generate_email node event
+    that follows carries the final, cleaned-up email.
+    
+    Streams share run_sdr_agent's single flight: a stream that finds a run
+    for the same domain and flags already in flight (here or, if distributed,
+    on another worker) joins it, gets no node events, and yields only
+    ("complete", result) once it finishes.
+    """
+    company_domain = normalize_domain(company_domain) or company_domain.strip()
+    key = _flight_key(company_domain, refresh_research, bypass_llm_cache)
+    events: asyncio.Queue = asyncio.Queue()
+    
+    async def execute() -> dict:
+        result = None
+        async for node, data in _stream_graph(
+            company_domain, stream_tokens, refresh_research, bypass_llm_cache
+        ):
+            if node == "complete":
+                result = data
+            else:
+                events.put_nowait((node, data))
+        return result
+    
+    run = asyncio.ensure_future(_shared_run(key, execute))
+    try:
+        while not run.done():
+            next_event = asyncio.ensure_future(events.get())
+            await asyncio.wait({next_event, run}, return_when=asyncio.FIRST_COMPLETED)
+            if next_event.done():
+                yield next_event.result()
+            else:
+                next_event.cancel()
+        while not events.empty():
+            yield events.get_nowait()
+        result = run.result()
+    finally:
+        # Only stops this caller's wait; the shared run itself is shielded
+        if not run.done():
+            run.cancel()
+    
+    yield "complete", result
+
+
+async def _stream_graph(
+    company_domain: str,
+    stream_tokens: bool,
+    refresh_research: bool,
+    bypass_llm_cache: bool
+) -> AsyncIterator[Tuple[str, dict]]:
+    final_state = _initial_state(company_domain, refresh_research, bypass_llm_cache)
+    
+    print(f"🤖 Streaming SDR Agent for {company_domain}")
+    
+    with traced_run(company_domain) as trace:
+        config = {
+            "configurable": {
+                "stream_email_tokens": stream_tokens,
+                "unit_of_work": UnitOfWork()
+            }
+        }
+        async for mode, payload in agent_graph.astream(
+            final_state, config, stream_mode=["updates", "custom"]
+        ):
+            if mode == "custom":
+                yield payload.pop("type"), payload
+                continue
+            for node, node_state in payload.items():
+                final_state = {**final_state, **node_state}
+                partial = {
+                    key: value for key, value in node_state.items()
+                    if key != "messages"
+                }
+                yield node, partial
+        result = _build_result(company_domain, final_state, trace)
+    
+    print("✅ Agent workflow completed!")
+    
+    yield "complete", result
+
+
+async def run_sdr_agent_batch(
+    company_domains: List[str],
+    concurrency: int,
+    refresh_research: bool = False,
+    bypass_llm_cache: bool = False
+) -> List[dict]:
+    """Run the SDR agent for many domains with at most `concurrency` runs in flight"""
+    results: List[Optional[dict]] = [None] * len(company_domains)
+    queue: asyncio.Queue = asyncio.Queue()
+    for index, company_domain in enumerate(company_domains):
+        queue.put_nowait((index, company_domain))
+
+    async def worker():
+        while True:
+            try:
+                index, company_domain = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                result = await run_sdr_agent(company_domain, refresh_research, bypass_llm_cache)
+                results[index] = {
+                    "company_domain": company_domain,
+                    "status": "completed",
+                    "result": result,
+                    "error": None
+                }
+            except Exception as e:
+                print(f"❌ Agent failed for {company_domain}: {e}")
+                results[index] = {
+                    "company_domain": company_domain,
+                    "status": "failed",
+                    "result": None,
+                    "error": str(e)
+                }
+
+    workers = max(1, min(concurrency, len(company_domains)))
+    await asyncio.gather(*(worker() for _ in range(workers)))
+
+    return results
@@ -0,0 +1,67 @@
+"""
+On-demand loading of the agent stack.
+
+Importing agent.py pulls in LangChain, LangGraph and the Anthropic client and
+builds the LLM and the compiled graph, which is about half of the API's
+import time. The CRM endpoints never need it, so the API loads it through
+here instead: in a worker thread, so the event loop keeps serving requests
+while the import runs. AGENT_PRELOAD picks when that happens:
+
+    background  start loading right after startup (default)
+    lazy        load on the first request that needs the agent
+    eager       import with main.py, e.g. before a fork-based server forks
+"""
+import asyncio
+import importlib
+from typing import Optional
+
+from config import get_settings
+
+settings = get_settings()
+
+PRELOAD_MODES = ("background", "lazy", "eager")
+
+_agent = None
+
+
+def preload_mode() -> str:
+    mode = settings.agent_preload.lower()
+    if mode not in PRELOAD_MODES:
+        raise ValueError(f"AGENT_PRELOAD must be one of: {', '.join(PRELOAD_MODES)}")
+    return mode
+
+
+def load_agent_now():
+    """Import the agent module in the calling thread"""
+    global _agent
+    _agent = importlib.import_module("agent")
+    return _agent
+
+
+async def load_agent():
+    """
+    The agent module, imported off the event loop on first use. Concurrent
+    callers are safe: the import lock makes later ones wait for the first.
+    """
+    if _agent is not None:
+        return _agent
+    return await asyncio.to_thread(load_agent_now)
+
+
+async def warm_up_agent() -> Optional[float]:
+    """Load the agent in the background; returns the seconds it took"""
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    try:
+        await load_agent()
+    except Exception as e:
+        # Surfaced again, with the same error, by the first research request
+        print(f"❌ Agent warm-up failed: {e}")
+        return None
+    elapsed = loop.time() - started
+    print(f"🤖 Agent stack loaded in {elapsed:.2f}s")
+    return elapsed
+
+
+def agent_loaded() -> bool:
+    return _agent is not None
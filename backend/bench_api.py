@@ -0,0 +1,214 @@
+"""
+In-process load test for the API with the offline fake LLM.
+
+Boots the FastAPI app (including its lifespan) inside this process against a
+fresh SQLite database, selects the deterministic FakeEmailChatModel, and
+drives the endpoints through httpx's ASGI transport in phases:
+
+    research  POST /api/research for unique domains
+    list      GET /api/leads, /api/leads?include=latest_email, /api/emails
+    delete    DELETE /api/leads/{id} for the leads created above
+
+Reports p50/p95/p99 latency, requests per second, errors and peak RSS per
+phase as JSON, so runs can be compared across commits:
+
+    python bench_api.py --requests 200 --concurrency 16 --llm-latency 0.2 --output run.json
+    python bench_api.py --baseline run.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, Optional
+
+
+def _percentile(values: list, percentile: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+    return ordered[index]
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_phase(
+    name: str,
+    send: Callable[[int], Awaitable[int]],
+    total: int,
+    concurrency: int
+) -> dict:
+    """Issue `total` requests with at most `concurrency` in flight"""
+    latencies = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < total:
+            index = next_index
+            next_index += 1
+            started = time.perf_counter()
+            try:
+                status = await send(index)
+            except Exception:
+                status = 0
+            latencies.append(time.perf_counter() - started)
+            if not 200 <= status < 300:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(min(concurrency, total))])
+    elapsed = time.perf_counter() - started
+
+    return {
+        "phase": name,
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(total / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50) * 1000, 2),
+            "p95": round(_percentile(latencies, 95) * 1000, 2),
+            "p99": round(_percentile(latencies, 99) * 1000, 2),
+            "max": round(max(latencies) * 1000, 2),
+        } if latencies else None,
+        "peak_rss_mb": _peak_rss_mb()
+    }
+
+
+async def run_benchmark(args) -> dict:
+    # Imported after the environment is configured; settings are cached
+    import httpx
+
+    from main import app, lifespan
+
+    lead_ids = []
+    list_paths = ("/api/leads", "/api/leads?include=latest_email", "/api/emails")
+    transport = httpx.ASGITransport(app=app)
+
+    async with lifespan(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+            async def research(index: int) -> int:
+                response = await client.post(
+                    "/api/research",
+                    json={"company_domain": f"bench-{index}.example.com"},
+                    timeout=None
+                )
+                if response.status_code == 200:
+                    lead_ids.append(response.json()["lead"]["lead_id"])
+                return response.status_code
+
+            async def list_page(index: int) -> int:
+                response = await client.get(list_paths[index % len(list_paths)], timeout=None)
+                return response.status_code
+
+            async def delete(index: int) -> int:
+                response = await client.delete(f"/api/leads/{lead_ids[index]}", timeout=None)
+                return response.status_code
+
+            phases = [await run_phase("research", research, args.requests, args.concurrency)]
+            phases.append(await run_phase("list", list_page, args.list_requests, args.concurrency))
+            phases.append(await run_phase("delete", delete, len(lead_ids), args.concurrency))
+
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "config": {
+            "requests": args.requests,
+            "list_requests": args.list_requests,
+            "concurrency": args.concurrency,
+            "llm_latency": args.llm_latency,
+            "llm_body_words": args.llm_body_words
+        },
+        "phases": phases,
+        "peak_rss_mb": _peak_rss_mb()
+    }
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    """Percentage change of throughput and tail latency against a baseline"""
+    previous = {phase["phase"]: phase for phase in baseline.get("phases", [])}
+    deltas = {}
+    for phase in report["phases"]:
+        before = previous.get(phase["phase"])
+        if not before or not before.get("latency_ms") or not phase.get("latency_ms"):
+            continue
+
+        def change(new, old):
+            return round((new - old) / old * 100, 1) if old else None
+
+        deltas[phase["phase"]] = {
+            "requests_per_second_pct": change(
+                phase["requests_per_second"], before["requests_per_second"]
+            ),
+            "p95_pct": change(phase["latency_ms"]["p95"], before["latency_ms"]["p95"]),
+            "p99_pct": change(phase["latency_ms"]["p99"], before["latency_ms"]["p99"]),
+        }
+    return {"commit": baseline.get("commit"), "phases": deltas}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="research requests")
+    parser.add_argument("--list-requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="fake LLM seconds per call")
+    parser.add_argument("--llm-body-words", type=int, default=150, help="fake email length")
+    parser.add_argument("--database-url", help="defaults to a fresh temporary SQLite file")
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--baseline", help="report from an earlier run to compare against")
+    args = parser.parse_args()
+
+    directory = tempfile.TemporaryDirectory(prefix="sdr-bench-")
+    os.environ.update({
+        "ANTHROPIC_API_KEY": os.environ.get("ANTHROPIC_API_KEY", "benchmark"),
+        "LLM_PROVIDER": "fake",
+        "FAKE_LLM_LATENCY": str(args.llm_latency),
+        "FAKE_LLM_BODY_WORDS": str(args.llm_body_words),
+        "DATABASE_URL": args.database_url or f"sqlite+aiosqlite:///{directory.name}/bench.db",
+        # Measure the service, not the provider quota
+        "LLM_REQUESTS_PER_MINUTE": "1000000",
+        "LLM_TOKENS_PER_MINUTE": "1000000000",
+        "LLM_MAX_CONCURRENCY": str(max(args.concurrency, 1)),
+    })
+
+    # The app logs each run to stdout; keep stdout for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        report = asyncio.run(run_benchmark(args))
+    directory.cleanup()
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            report["baseline"] = compare(report, json.load(baseline_file))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Cold-start benchmark for the API server.
+
+For each AGENT_PRELOAD mode, starts `uvicorn main:app` in a fresh process
+against an empty SQLite database with the offline fake LLM and measures:
+
+    import_s          `import main` in a fresh interpreter
+    first_read_s      process start until GET /api/leads returns 200
+    first_research_s  process start until POST /api/research returns 200
+
+    python bench_startup.py --repeat 3
+    python bench_startup.py --modes eager background --output startup.json
+
+Prints one JSON object with the median of each measurement per mode.
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Optional
+
+import httpx
+
+from agent_loader import PRELOAD_MODES
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _environment(mode: str, database_path: str) -> dict:
+    return {
+        **os.environ,
+        "ANTHROPIC_API_KEY": os.environ.get("ANTHROPIC_API_KEY", "benchmark"),
+        "LLM_PROVIDER": "fake",
+        "FAKE_LLM_LATENCY": "0",
+        "AGENT_PRELOAD": mode,
+        "DATABASE_URL": f"sqlite+aiosqlite:///{database_path}",
+    }
+
+
+def measure_import(mode: str, database_path: str) -> float:
+    """Seconds for `import main` in a fresh interpreter"""
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=BACKEND_DIR, env=_environment(mode, database_path),
+        capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def _poll(request, deadline: float) -> Optional[float]:
+    while time.perf_counter() < deadline:
+        try:
+            if request().status_code == 200:
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def measure_server(mode: str, database_path: str, timeout: float) -> dict:
+    """Time from process start to the first read and the first research run"""
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=_environment(mode, database_path),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = started + timeout
+        with httpx.Client(base_url=base_url, timeout=timeout) as client:
+            first_read = _poll(lambda: client.get("/api/leads"), deadline)
+            first_research = _poll(
+                lambda: client.post("/api/research", json={"company_domain": "startup.example.com"}),
+                deadline
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        "first_read_s": first_read - started if first_read else None,
+        "first_research_s": first_research - started if first_research else None,
+    }
+
+
+def _median(values: list) -> Optional[float]:
+    values = [value for value in values if value is not None]
+    return round(statistics.median(values), 3) if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=PRELOAD_MODES, default=["eager", "background", "lazy"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for each server")
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+
+    results = []
+    for mode in args.modes:
+        samples = []
+        for _ in range(args.repeat):
+            # A fresh database each time so schema creation is part of startup
+            with tempfile.TemporaryDirectory(prefix="sdr-startup-") as directory:
+                database_path = os.path.join(directory, "startup.db")
+                sample = {"import_s": measure_import(mode, database_path)}
+                sample.update(measure_server(mode, database_path, args.timeout))
+                samples.append(sample)
+
+        results.append({
+            "mode": mode,
+            **{
+                key: _median([sample[key] for sample in samples])
+                for key in ("import_s", "first_read_s", "first_research_s")
+            }
+        })
+
+    output = json.dumps({
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "modes": results
+    }, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Caches for company research results and LLM completions.
+
+Research: an in-memory LRU sits in front of the `research_cache` table so a
+domain researched by any worker, or before a restart, is served without
+repeating the search. Entries expire after RESEARCH_CACHE_TTL_SECONDS.
+
+LLM: completions are stored in the `llm_cache` table under a hash of model,
+temperature and prompt, bounded by LLM_CACHE_TTL_SECONDS and
+LLM_CACHE_MAX_ENTRIES (least recently used rows are evicted first).
+"""
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import delete, select, or_
+
+from database import ResearchCacheEntry, LLMCacheEntry, async_session
+from domains import normalize_domain
+from config import get_settings
+
+settings = get_settings()
+
+
+class ResearchCache:
+    """In-memory LRU backed by a persistent table, both bounded by a TTL"""
+
+    def __init__(self, ttl_seconds: int, memory_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    async def get(self, company_domain: str) -> Optional[dict]:
+        key = normalize_domain(company_domain)
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, research_data = entry
+            if expires_at > time.time():
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return research_data
+            del self._memory[key]
+
+        async with async_session() as session:
+            row = await session.get(ResearchCacheEntry, key)
+            if row is not None and row.expires_at > datetime.utcnow():
+                research_data = json.loads(row.research_data)
+                remaining = (row.expires_at - datetime.utcnow()).total_seconds()
+                self._remember(key, research_data, time.time() + remaining)
+                self.db_hits += 1
+                return research_data
+
+        self.misses += 1
+        return None
+
+    async def set(self, company_domain: str, research_data: dict) -> None:
+        key = normalize_domain(company_domain)
+        now = datetime.utcnow()
+
+        async with async_session() as session:
+            await session.merge(ResearchCacheEntry(
+                company_domain=key,
+                research_data=json.dumps(research_data),
+                created_at=now,
+                expires_at=now + timedelta(seconds=self.ttl_seconds)
+            ))
+            await session.commit()
+
+        self._remember(key, research_data, time.time() + self.ttl_seconds)
+
+    async def purge_expired(self) -> int:
+        """Delete expired rows from the persistent tier"""
+        async with async_session() as session:
+            result = await session.execute(
+                delete(ResearchCacheEntry).where(
+                    ResearchCacheEntry.expires_at <= datetime.utcnow()
+                )
+            )
+            await session.commit()
+            return result.rowcount
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.db_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.db_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_size": self.memory_size,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+    def _remember(self, key: str, research_data: dict, expires_at: float) -> None:
+        self._memory[key] = (expires_at, research_data)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+
+class LLMResponseCache:
+    """Content-addressed store of raw LLM completions"""
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model: str, temperature: float, prompt: str) -> str:
+        payload = json.dumps([model, temperature, prompt])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, cache_key: str) -> Optional[str]:
+        now = datetime.utcnow()
+        async with async_session() as session:
+            row = await session.get(LLMCacheEntry, cache_key)
+            if row is None or row.expires_at <= now:
+                self.misses += 1
+                return None
+            row.last_used_at = now
+            await session.commit()
+            self.hits += 1
+            return row.response
+
+    async def set(self, cache_key: str, model: str, response: str) -> None:
+        now = datetime.utcnow()
+        async with async_session() as session:
+            await session.merge(LLMCacheEntry(
+                cache_key=cache_key,
+                model=model,
+                response=response,
+                created_at=now,
+                last_used_at=now,
+                expires_at=now + timedelta(seconds=self.ttl_seconds)
+            ))
+            await session.flush()
+
+            # Evict expired rows and everything past the size bound, oldest use first
+            overflow = (
+                select(LLMCacheEntry.cache_key)
+                .order_by(LLMCacheEntry.last_used_at.desc())
+                .offset(self.max_entries)
+            )
+            await session.execute(
+                delete(LLMCacheEntry).where(or_(
+                    LLMCacheEntry.expires_at <= now,
+                    LLMCacheEntry.cache_key.in_(overflow)
+                ))
+            )
+            await session.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+
+research_cache = ResearchCache(
+    ttl_seconds=settings.research_cache_ttl_seconds,
+    memory_size=settings.research_cache_memory_size
+)
+
+llm_cache = LLMResponseCache(
+    ttl_seconds=settings.llm_cache_ttl_seconds,
+    max_entries=settings.llm_cache_max_entries
+)
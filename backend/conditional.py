@@ -0,0 +1,101 @@
+"""
+Conditional GET (ETag / Last-Modified) for CRM reads.
+
+Collection validators come from the per-collection change counters in
+collection_changes, which every lead and email write (deletes included)
+bumps in its own transaction. Checking them is one primary-key lookup, so
+an unchanged collection is answered with 304 before any row is read, and
+the cost does not grow with the table. Single resources and a lead's
+emails use small aggregates over indexed columns instead.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import CollectionChange
+
+
+class Validators:
+    """ETag and Last-Modified for one representation"""
+
+    def __init__(self, etag: str, last_modified: Optional[datetime]):
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def headers(self) -> dict:
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = format_datetime(
+                self.last_modified.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True
+            )
+        return headers
+
+    def matches(self, request: Request) -> bool:
+        """True when the client's cached copy is still current"""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            # If-None-Match takes precedence; weak comparison per RFC 9110
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or self.etag.removeprefix("W/") in tags
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and self.last_modified is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            return self.last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+        return False
+
+    def not_modified(self) -> Response:
+        return Response(status_code=304, headers=self.headers())
+
+    def apply(self, response: Response) -> Response:
+        response.headers.update(self.headers())
+        return response
+
+
+def make_validators(
+    kind: str,
+    state: tuple,
+    last_modified: Optional[datetime],
+    variant: str = ""
+) -> Validators:
+    """
+    Hash a resource's change state (plus the query variant, since one URL's
+    parameters select the representation) into a weak ETag.
+    """
+    digest = hashlib.sha1(repr((kind, state, variant)).encode("utf-8")).hexdigest()[:20]
+    return Validators(f'W/"{digest}"', last_modified)
+
+
+async def collection_state(
+    db: AsyncSession,
+    model,
+    timestamp_column,
+    *criteria
+) -> tuple:
+    """(count, max id, max timestamp) of `model` rows matching `criteria`"""
+    query = select(func.count(), func.max(model.id), func.max(timestamp_column))
+    query = query.select_from(model.__table__)
+    for criterion in criteria:
+        query = query.where(criterion)
+    count, max_id, max_timestamp = (await db.execute(query)).one()
+    return count, max_id, max_timestamp
+
+
+async def collection_versions(db: AsyncSession, *names: str) -> tuple:
+    """((version, changed_at), ...) for each collection in `names`"""
+    result = await db.execute(
+        select(CollectionChange.name, CollectionChange.version, CollectionChange.changed_at)
+        .where(CollectionChange.name.in_(names))
+    )
+    found = {name: (version, changed_at) for name, version, changed_at in result}
+    return tuple(found.get(name, (0, None)) for name in names)
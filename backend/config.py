@@ -3,9 +3,71 @@ from functools import lru_cache
 
 
 class Settings(BaseSettings):
-    anthropic_api_key: str
+    anthropic_api_key: str = ""  # required when llm_provider is anthropic
     tavily_api_key: str = ""
     database_url: str = "sqlite+aiosqlite:///./crm.db"
+    database_echo: bool = False
+    database_statement_cache_size: int = 256
+    # SQLite profile
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kib: int = 20000
+    # PostgreSQL (asyncpg) profile
+    database_pool_size: int = 10
+    database_max_overflow: int = 20
+    database_pool_timeout: float = 30.0
+    database_pool_recycle: int = 1800
+    database_pool_pre_ping: bool = True
+    llm_provider: str = "anthropic"  # anthropic, fake
+    fake_llm_latency: float = 0.5
+    fake_llm_body_words: int = 150
+    llm_timeout_seconds: float = 30.0
+    llm_hedge_enabled: bool = True
+    llm_hedge_percentile: float = 95.0
+    llm_hedge_initial_delay: float = 8.0
+    llm_hedge_min_delay: float = 1.0
+    llm_hedge_max_delay: float = 20.0
+    llm_hedge_window: int = 200
+    llm_hedge_min_samples: int = 20
+    llm_requests_per_minute: int = 50
+    llm_tokens_per_minute: int = 50000
+    llm_output_token_estimate: int = 400
+    llm_max_concurrency: int = 16
+    llm_min_concurrency: int = 1
+    llm_max_retries: int = 4
+    llm_retry_base_delay: float = 1.0
+    llm_retry_max_delay: float = 30.0
+    agent_parallel_steps: bool = True
+    agent_preload: str = "background"  # background, lazy, eager
+    batch_max_concurrency: int = 8
+    batch_max_domains: int = 20000
+    research_cache_enabled: bool = True
+    research_cache_ttl_seconds: int = 7 * 24 * 3600
+    research_cache_memory_size: int = 1024
+    llm_cache_enabled: bool = False
+    llm_cache_ttl_seconds: int = 30 * 24 * 3600
+    llm_cache_max_entries: int = 10000
+    single_flight_distributed: bool = False
+    single_flight_lease_seconds: int = 300
+    single_flight_poll_interval: float = 0.5
+    single_flight_result_grace_seconds: float = 30.0
+    lead_import_batch_size: int = 1000
+    lead_import_max_errors: int = 1000
+    lead_import_max_line_bytes: int = 1024 * 1024
+    export_chunk_size: int = 1000
+    job_workers: int = 2
+    job_poll_interval: float = 1.0
+    job_lease_seconds: int = 600
+    job_max_attempts: int = 3
+    trace_enabled: bool = True
+    trace_batch_size: int = 200
+    trace_flush_interval: float = 2.0
+    trace_queue_size: int = 10000
+    trace_retention_days: int = 14
+    crm_write_batch_size: int = 100
+    crm_write_flush_ms: float = 5.0
+    crm_write_queue_size: int = 10000
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,163 @@
+"""
+Group commit for the CRM writes of agent runs.
+
+Every run ends with a lead upsert and an email insert. Committed one run at
+a time, concurrent runs queue up on SQLite's single write lock and each pays
+its own fsync. CRMWriter instead collects the pending writes of all in-flight
+runs and commits them in one transaction per batch, flushed when the batch
+is full or its deadline (a few milliseconds) passes. Writes that arrive
+while a batch is committing simply join the next one.
+
+Callers await a future that resolves with the written lead and email, ids
+included. A lead and its email always land in the same transaction.
+"""
+import asyncio
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from database import Email, async_session, record_change
+from leads import upsert_leads
+from metrics import CRM_WRITE_BATCH_SIZE, CRM_WRITE_DURATION
+from config import get_settings
+
+settings = get_settings()
+
+
+@dataclass
+class PendingWrite:
+    lead: Optional[dict]
+    email: Optional[dict]
+    future: asyncio.Future = field(repr=False)
+
+
+class CRMWriter:
+    """Batches lead upserts and email inserts into shared transactions"""
+
+    def __init__(self, session_factory, batch_size: int, flush_interval: float, queue_size: int):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def write(self, lead: Optional[dict] = None, email: Optional[dict] = None) -> dict:
+        """
+        Upsert `lead` and/or insert an Email built from the `email` columns in
+        the next batch. An email without a lead_id gets the id of the lead
+        written with it. Returns {"lead": upsert result or None, "email": the
+        saved Email or None}.
+        """
+        return await (await self.submit(lead, email))
+
+    async def submit(self, lead: Optional[dict] = None, email: Optional[dict] = None) -> asyncio.Future:
+        """Queue a write and return the future it resolves; waits only when the queue is full"""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self.start()
+        future = loop.create_future()
+        await self._queue.put(PendingWrite(lead, email, future))
+        return future
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the writer after committing whatever is queued"""
+        if self._task is None:
+            return
+        if not self._task.done():
+            # None is the stop sentinel, queued behind every pending write
+            await self._queue.put(None)
+            await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stopping = False
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                # Take what is already queued without waiting, then wait out
+                # the rest of the deadline for stragglers
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+            if stopping:
+                return
+
+    async def _flush(self, batch: List[PendingWrite]) -> None:
+        started = asyncio.get_running_loop().time()
+        try:
+            results = await self._commit(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                _resolve(batch[0], error=e)
+                return
+            # One bad write must not fail the others: retry each on its own
+            for write in batch:
+                await self._flush([write])
+            return
+
+        CRM_WRITE_BATCH_SIZE.observe(len(batch))
+        CRM_WRITE_DURATION.observe(asyncio.get_running_loop().time() - started)
+        for write, result in zip(batch, results):
+            _resolve(write, result=result)
+
+    async def _commit(self, batch: List[PendingWrite]) -> List[dict]:
+        async with self.session_factory() as session:
+            # One multi-row upsert for the batch's leads, then one multi-row
+            # INSERT for its emails on commit
+            leads = await upsert_leads(
+                session, [write.lead for write in batch if write.lead is not None]
+            )
+            results = []
+            for write in batch:
+                lead = leads[write.lead["company_domain"]] if write.lead is not None else None
+                email = None
+                if write.email is not None:
+                    # Built per attempt: a failed batch is retried write by write
+                    email = Email(**write.email)
+                    if email.lead_id is None and lead is not None:
+                        email.lead_id = lead["lead_id"]
+                    session.add(email)
+                results.append({"lead": lead, "email": email})
+            if any(write.email is not None for write in batch):
+                await record_change(session, "emails")
+            await session.commit()
+        return results
+
+
+def _resolve(write: PendingWrite, result: Optional[dict] = None, error: Optional[Exception] = None) -> None:
+    # The caller may have been cancelled; the write still happened (or not)
+    if write.future.done():
+        return
+    if error is not None:
+        write.future.set_exception(error)
+    else:
+        write.future.set_result(result)
+
+
+crm_writer = CRMWriter(
+    async_session,
+    batch_size=settings.crm_write_batch_size,
+    flush_interval=settings.crm_write_flush_ms / 1000,
+    queue_size=settings.crm_write_queue_size
+)
@@ -1,18 +1,94 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Float, Index, event, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.dialects import postgresql, sqlite
 from datetime import datetime
+from typing import Optional
 from config import get_settings
+from search import create_search_index
+from metrics import instrument_engine
 
 settings = get_settings()
 
+SQLITE_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SQLITE_SYNCHRONOUS_LEVELS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+def _sqlite_pragmas(config) -> list:
+    journal_mode = config.sqlite_journal_mode.upper()
+    synchronous = config.sqlite_synchronous.upper()
+    if journal_mode not in SQLITE_JOURNAL_MODES:
+        raise ValueError(f"Unsupported SQLITE_JOURNAL_MODE: {config.sqlite_journal_mode}")
+    if synchronous not in SQLITE_SYNCHRONOUS_LEVELS:
+        raise ValueError(f"Unsupported SQLITE_SYNCHRONOUS: {config.sqlite_synchronous}")
+    return [
+        f"PRAGMA journal_mode={journal_mode}",
+        f"PRAGMA synchronous={synchronous}",
+        f"PRAGMA cache_size=-{int(config.sqlite_cache_size_kib)}",
+    ]
+
+
+def create_engine_from_settings(config):
+    """
+    Build the async engine for the configured storage profile.
+
+    SQLite: WAL lets readers run alongside the single writer, the busy
+    timeout makes concurrent writers (e.g. several uvicorn workers) wait for
+    the lock instead of failing, and synchronous=NORMAL skips the fsync per
+    commit. In WAL mode that keeps the database consistent, but a power loss
+    or OS crash can roll back the most recent commits (an application crash
+    cannot); use SQLITE_SYNCHRONOUS=FULL where every commit must survive.
+    PostgreSQL (asyncpg): a bounded pool with pre-ping and recycling.
+    """
+    url = make_url(config.database_url)
+    backend = url.get_backend_name()
+
+    if backend == "sqlite":
+        engine = create_async_engine(
+            url,
+            echo=config.database_echo,
+            connect_args={
+                # sqlite3's timeout is the busy timeout
+                "timeout": config.sqlite_busy_timeout_ms / 1000,
+                "cached_statements": config.database_statement_cache_size,
+            },
+        )
+        pragmas = _sqlite_pragmas(config)
+        if url.database in (None, "", ":memory:"):
+            # In-memory databases have no journal file to switch to WAL
+            pragmas = pragmas[1:]
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def _configure_sqlite(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+
+        return engine
+
+    if backend == "postgresql":
+        return create_async_engine(
+            url,
+            echo=config.database_echo,
+            pool_size=config.database_pool_size,
+            max_overflow=config.database_max_overflow,
+            pool_timeout=config.database_pool_timeout,
+            pool_recycle=config.database_pool_recycle,
+            pool_pre_ping=config.database_pool_pre_ping,
+            connect_args={
+                "prepared_statement_cache_size": config.database_statement_cache_size,
+            },
+        )
+
+    raise ValueError(f"Unsupported DATABASE_URL backend: {backend}")
+
+
 # Create async engine
-engine = create_async_engine(
-    settings.database_url,
-    echo=True,
-    future=True
-)
+engine = create_engine_from_settings(settings)
+instrument_engine(engine)
 
 # Create async session factory
 async_session = sessionmaker(
@@ -33,6 +109,11 @@ class Lead(Base):
     research_summary = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        # Keyset pagination order: (created_at DESC, id DESC)
+        Index("ix_leads_created_at_id", "created_at", "id"),
+    )
 
 
 class Email(Base):
@@ -45,6 +126,144 @@ class Email(Base):
     status = Column(String, default="draft")  # draft, sent, failed
     created_at = Column(DateTime, default=datetime.utcnow)
     sent_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_emails_created_at_id", "created_at", "id"),
+        Index("ix_emails_lead_id_created_at", "lead_id", "created_at"),
+    )
+
+
+class CollectionChange(Base):
+    """
+    Change counter per collection (leads, emails), bumped in the transaction
+    of every write, so conditional GETs validate with one primary-key lookup.
+    """
+    __tablename__ = "collection_changes"
+    
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    changed_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ResearchCacheEntry(Base):
+    __tablename__ = "research_cache"
+    
+    company_domain = Column(String, primary_key=True)
+    research_data = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, index=True)
+
+
+class LLMCacheEntry(Base):
+    __tablename__ = "llm_cache"
+    
+    cache_key = Column(String, primary_key=True)
+    model = Column(String)
+    response = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
+    expires_at = Column(DateTime, index=True)
+
+
+class AgentRunLease(Base):
+    __tablename__ = "agent_run_leases"
+    
+    flight_key = Column(String, primary_key=True)  # domain plus the run's cache flags
+    owner = Column(String)
+    status = Column(String, default="running")  # running, completed, failed
+    result = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    expires_at = Column(DateTime)
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+    
+    id = Column(String, primary_key=True)
+    company_domain = Column(String)
+    refresh_research = Column(Boolean, default=False)
+    bypass_llm_cache = Column(Boolean, default=False)
+    status = Column(String, default="queued", index=True)  # queued, running, completed, failed
+    result = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0)
+    locked_by = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class AgentRun(Base):
+    """Compact execution trace of one SDR agent run"""
+    __tablename__ = "agent_runs"
+    
+    id = Column(String, primary_key=True)
+    company_domain = Column(String)
+    status = Column(String)  # success, error
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    duration_ms = Column(Float)
+    llm_cache_hit = Column(Boolean, default=False)
+    research_cache_hit = Column(Boolean, default=False)
+    input_tokens = Column(Integer, default=0)
+    output_tokens = Column(Integer, default=0)
+    
+    __table_args__ = (
+        Index("ix_agent_runs_started_at_duration", "started_at", "duration_ms"),
+    )
+
+
+class AgentRunSpan(Base):
+    """One graph node execution within an agent run"""
+    __tablename__ = "agent_run_spans"
+    
+    id = Column(Integer, primary_key=True)
+    run_id = Column(String, index=True)
+    node = Column(String)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    duration_ms = Column(Float)
+    error = Column(Text, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_agent_run_spans_node_started_at", "node", "started_at"),
+    )
+
+
+class UnitOfWork:
+    """
+    CRM writes of one agent run.
+    The CRM tool stages the lead on it instead of writing, and the email
+    tool writes the lead and the email in one transaction, so a lead is
+    never saved without its email.
+    """
+    
+    def __init__(self):
+        self.pending_lead: Optional[dict] = None
+        self.lead_result: Optional[dict] = None
+
+
+_CHANGE_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+async def record_change(session: AsyncSession, *names: str) -> None:
+    """Bump the change counters of `names` inside the caller's transaction"""
+    table = CollectionChange.__table__
+    statement = _CHANGE_INSERTS[session.get_bind().dialect.name](table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.name],
+        set_={"version": table.c.version + 1, "changed_at": statement.excluded.changed_at}
+    )
+    now = datetime.utcnow()
+    # Sorted so concurrent writers lock the counter rows in the same order
+    await session.execute(
+        statement, [{"name": name, "version": 1, "changed_at": now} for name in sorted(set(names))]
+    )
 
 
 async def get_db():
@@ -52,6 +271,48 @@ async def get_db():
         yield session
 
 
-async def init_db():
-    async with engine.begin() as conn:
+def _add_missing_columns(connection):
+    # create_all skips tables that already exist, so columns added to an
+    # existing model are added here (nullable, without a server default)
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    quote = connection.dialect.identifier_preparer.quote
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=connection.dialect)
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"
+                )
+
+
+def _create_missing_indexes(connection):
+    # create_all skips tables that already exist, so indexes added to an
+    # existing model are created here
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def _drop_legacy_lease_table(connection):
+    # Leases used to be keyed by a `company_domain` column. They only live
+    # for the length of a run, so the old table is dropped and recreated.
+    inspector = inspect(connection)
+    if "agent_run_leases" not in inspector.get_table_names():
+        return
+    columns = {column["name"] for column in inspector.get_columns("agent_run_leases")}
+    if "flight_key" not in columns:
+        AgentRunLease.__table__.drop(connection)
+
+
+async def init_db(bind=None):
+    """Create tables, indexes and the search index on `bind` (default engine)"""
+    async with (bind or engine).begin() as conn:
+        await conn.run_sync(_drop_legacy_lease_table)
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_create_missing_indexes)
+        await conn.run_sync(create_search_index)
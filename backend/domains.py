@@ -0,0 +1,19 @@
+"""
+Helpers for company domains.
+"""
+from urllib.parse import urlsplit
+
+
+def normalize_domain(domain: str) -> str:
+    """
+    Reduce user input such as "https://www.OpenAI.com/about" to "openai.com"
+    so the same company always maps to the same key.
+    """
+    value = domain.strip().lower()
+    if "://" not in value:
+        value = f"//{value}"
+    host = urlsplit(value).hostname or ""
+    host = host.rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    return host
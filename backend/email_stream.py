@@ -0,0 +1,79 @@
+"""
+Incremental extraction of the subject and body from a streamed email completion.
+
+The email prompt asks the model for a JSON object ({"subject": ..., "body": ...}),
+so raw tokens are JSON syntax. This parser follows the stream and emits only the
+decoded text of the two string values as it arrives, which lets the client render
+the email while it is still being generated.
+"""
+import json
+import re
+from typing import List, Optional, Tuple
+
+_FIELD_START = re.compile(r'"(subject|body)"\s*:\s*"')
+
+
+class EmailStreamParser:
+    """Turn raw JSON completion chunks into (field, text_delta) pairs"""
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._field: Optional[str] = None
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        self._buffer += text
+        deltas = []
+
+        while True:
+            if self._field is None:
+                match = _FIELD_START.search(self._buffer, self._pos)
+                if not match:
+                    break
+                self._field = match.group(1)
+                self._pos = match.end()
+                continue
+
+            delta, closed = self._read_string()
+            if delta:
+                deltas.append((self._field, clean_delta(delta)))
+            if not closed:
+                break
+            self._field = None
+
+        return [(field, delta) for field, delta in deltas if delta]
+
+    def _read_string(self) -> Tuple[str, bool]:
+        """Decode as much of the current JSON string value as is available"""
+        start = self._pos
+        index = start
+        buffer = self._buffer
+
+        while index < len(buffer):
+            char = buffer[index]
+            if char == '"':
+                self._pos = index + 1
+                return _decode(buffer[start:index]), True
+            if char == "\\":
+                # Leave partial escape sequences for the next chunk
+                escape_length = 6 if buffer[index + 1:index + 2] == "u" else 2
+                if index + escape_length > len(buffer):
+                    break
+                index += escape_length
+                continue
+            index += 1
+
+        self._pos = index
+        return _decode(buffer[start:index]), False
+
+
+def _decode(raw: str) -> str:
+    try:
+        return json.loads(f'"{raw}"')
+    except ValueError:
+        return raw
+
+
+def clean_delta(delta: str) -> str:
+    """Apply the per-character cleanup rules of generate_email_node to a delta"""
+    return delta.replace('"', '')
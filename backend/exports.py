@@ -0,0 +1,78 @@
+"""
+Streaming exports of CRM tables as NDJSON or CSV.
+
+Rows are read through a server-side cursor in fixed-size partitions and
+written out as they arrive, so an export of any size runs in constant memory
+and starts sending bytes immediately.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+
+from sqlalchemy import select
+
+from database import async_session
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def resolve_columns(model, requested: Optional[str]) -> List[str]:
+    """Validate a comma-separated column list against the model's table"""
+    available = [column.name for column in model.__table__.columns]
+    if not requested:
+        return available
+    columns = [name.strip() for name in requested.split(",") if name.strip()]
+    unknown = [name for name in columns if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    return columns
+
+
+def _format_value(value):
+    if isinstance(value, datetime):
+        return str(value)
+    return value
+
+
+async def stream_export(
+    model,
+    columns: List[str],
+    fmt: str,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    chunk_size: int = 1000
+) -> AsyncIterator[bytes]:
+    """Yield the selected rows of `model`, oldest first, in the given format"""
+    table = model.__table__
+    query = select(*[table.c[name] for name in columns]).order_by(table.c.id)
+    if created_after is not None:
+        query = query.where(table.c.created_at >= created_after)
+    if created_before is not None:
+        query = query.where(table.c.created_at < created_before)
+
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue().encode("utf-8")
+
+    async with async_session() as session:
+        result = await session.stream(query.execution_options(yield_per=chunk_size))
+        async for partition in result.partitions():
+            if fmt == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows(
+                    [_format_value(value) for value in row] for row in partition
+                )
+                yield buffer.getvalue().encode("utf-8")
+            else:
+                yield "".join(
+                    json.dumps(dict(zip(columns, row)), default=str) + "\n"
+                    for row in partition
+                ).encode("utf-8")
@@ -0,0 +1,135 @@
+"""
+Offline chat model for tests and benchmarks.
+
+FakeEmailChatModel answers the email prompt with a deterministic JSON email
+after an injectable delay, so latency-sensitive code (hedging, timeouts,
+streaming) can be exercised without an Anthropic key or network access.
+Select it with LLM_PROVIDER=fake.
+"""
+import asyncio
+import json
+import re
+import time
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+_COMPANY = re.compile(r"- Company: (.+)")
+
+
+class FakeEmailChatModel(BaseChatModel):
+    """Deterministic stand-in for ChatAnthropic with configurable latency"""
+
+    model: str = "fake-email-model"
+    temperature: float = 0.7
+    # Seconds to wait before answering; latency_fn(call_index) overrides it
+    latency: float = 0.0
+    latency_fn: Optional[Callable[[int], float]] = None
+    # Streaming granularity and pacing
+    chunk_size: int = 16
+    chunk_delay: float = 0.0
+    body_words: int = 150
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-email"
+
+    def _next_latency(self) -> float:
+        call_index = self.calls
+        self.calls += 1
+        if self.latency_fn is not None:
+            return self.latency_fn(call_index)
+        return self.latency
+
+    def _completion(self, messages: List[BaseMessage]) -> str:
+        prompt = str(messages[-1].content) if messages else ""
+        match = _COMPANY.search(prompt)
+        company = match.group(1).strip() if match else "the company"
+        filler = " ".join(["operational"] * max(self.body_words - 20, 0))
+        body = (
+            f"Hi {company},\n\n"
+            f"{company} stands out in its market. {filler}\n\n"
+            "Would you be open to a short conversation?\n\n"
+            "Best regards,\n\nWasiu Ibrahim"
+        )
+        return json.dumps({"subject": f"Operational Efficiency for {company}", "body": body})
+
+    def _usage(self, messages: List[BaseMessage], completion: str) -> dict:
+        input_tokens = sum(len(str(message.content)) for message in messages) // 4
+        output_tokens = len(completion) // 4
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens
+        }
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        time.sleep(self._next_latency())
+        completion = self._completion(messages)
+        message = AIMessage(content=completion, usage_metadata=self._usage(messages, completion))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        await asyncio.sleep(self._next_latency())
+        completion = self._completion(messages)
+        message = AIMessage(content=completion, usage_metadata=self._usage(messages, completion))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self._next_latency())
+        completion = self._completion(messages)
+        for start in range(0, len(completion), self.chunk_size):
+            if self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            text = completion[start:start + self.chunk_size]
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+        # Like Anthropic, usage arrives on a final empty chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="", usage_metadata=self._usage(messages, completion)
+        ))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self._next_latency())
+        completion = self._completion(messages)
+        for start in range(0, len(completion), self.chunk_size):
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+            text = completion[start:start + self.chunk_size]
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                await run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="", usage_metadata=self._usage(messages, completion)
+        ))
@@ -0,0 +1,128 @@
+"""
+Hedged LLM calls with a hard deadline.
+
+If the first request has not answered after the adaptive hedge delay (a
+percentile of recently observed latencies), an identical second request is
+started and whichever finishes first wins; the other is cancelled. Nothing
+is allowed to run past LLM_TIMEOUT_SECONDS, after which callers fall back to
+the template email.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+
+class HedgingPolicy:
+    """Issue hedged requests against a chat model and track their latency"""
+
+    def __init__(
+        self,
+        enabled: bool,
+        percentile: float,
+        initial_delay: float,
+        min_delay: float,
+        max_delay: float,
+        window: int,
+        min_samples: int,
+        timeout: float
+    ):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.timeout = timeout
+        self._latencies: deque = deque(maxlen=window)
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+
+    def hedge_delay(self) -> float:
+        """Current delay before a hedge request is sent"""
+        if len(self._latencies) < self.min_samples:
+            return self.initial_delay
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return min(self.max_delay, max(self.min_delay, ordered[index]))
+
+    async def ainvoke(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        can_hedge: Optional[Callable[[], bool]] = None
+    ) -> Any:
+        """
+        Run `call` with hedging. Raises asyncio.TimeoutError when no request
+        succeeds within the deadline; re-raises the last error if all fail.
+        `can_hedge` lets the caller veto the second request, e.g. while the
+        rate limiter already has a queue.
+        """
+        self.calls += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        started = {}
+
+        def launch() -> asyncio.Task:
+            task = asyncio.ensure_future(call())
+            started[task] = time.perf_counter()
+            return task
+
+        pending = {launch()}
+        primary = next(iter(pending))
+        hedge_at = loop.time() + self.hedge_delay() if self.enabled else None
+        last_error = None
+
+        try:
+            while pending:
+                now = loop.time()
+                if now >= deadline:
+                    break
+                wake_at = deadline if hedge_at is None else min(deadline, hedge_at)
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=max(0.0, wake_at - now),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+
+                for task in done:
+                    if task.exception() is None:
+                        # Measured from the primary's launch: a hedge that won
+                        # means the primary took at least this long, and the
+                        # hedge's own (shorter) latency would drag the delay
+                        # down until every call is hedged
+                        self._latencies.append(time.perf_counter() - started[primary])
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    last_error = task.exception()
+
+                if hedge_at is not None and (loop.time() >= hedge_at or not pending):
+                    # Hedge when the primary is slow, or retry at once if it failed
+                    hedge_at = None
+                    if not pending or can_hedge is None or can_hedge():
+                        self.hedged += 1
+                        pending.add(launch())
+
+            if last_error is not None and not pending:
+                raise last_error
+            # The primary was still running at the deadline; count it as
+            # taking the whole timeout rather than dropping the slowest calls
+            if primary in pending:
+                self._latencies.append(self.timeout)
+            self.timeouts += 1
+            raise asyncio.TimeoutError(f"LLM call exceeded {self.timeout}s deadline")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "timeouts": self.timeouts,
+            "hedge_delay": self.hedge_delay(),
+            "samples": len(self._latencies)
+        }
@@ -0,0 +1,281 @@
+"""
+Persistent job queue for SDR agent runs.
+
+Jobs live in the `jobs` table so they survive restarts. Every process runs a
+small pool of in-process workers that claim jobs with a single conditional
+UPDATE, which guarantees a job is only picked up once even when several
+uvicorn workers share the same database. A claim is a lease: the process
+renews it while the job runs, so only jobs of a dead worker ever expire and
+get requeued.
+"""
+import asyncio
+import json
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Set
+
+from sqlalchemy import select, update, and_
+
+from database import Job, async_session
+from agent_loader import load_agent
+from config import get_settings
+
+settings = get_settings()
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def enqueue_job(
+    company_domain: str,
+    refresh_research: bool = False,
+    bypass_llm_cache: bool = False
+) -> Job:
+    """Persist a new queued job and return it"""
+    async with async_session() as session:
+        job = Job(
+            id=uuid.uuid4().hex,
+            company_domain=company_domain,
+            refresh_research=refresh_research,
+            bypass_llm_cache=bypass_llm_cache,
+            status="queued",
+            attempts=0
+        )
+        session.add(job)
+        await session.commit()
+        return job
+
+
+async def get_job(job_id: str) -> Optional[Job]:
+    """Load a job by id"""
+    async with async_session() as session:
+        return await session.get(Job, job_id)
+
+
+async def claim_next_job() -> Optional[Job]:
+    """Atomically move the oldest queued job to running and return it"""
+    claim_token = f"{WORKER_ID}:{uuid.uuid4().hex}"
+    now = datetime.utcnow()
+
+    oldest_queued = (
+        select(Job.id)
+        .where(Job.status == "queued")
+        .order_by(Job.created_at)
+        .limit(1)
+        .scalar_subquery()
+    )
+
+    async with async_session() as session:
+        # The status guard makes the claim safe under concurrent workers:
+        # only one UPDATE can flip a given row from queued to running.
+        result = await session.execute(
+            update(Job)
+            .where(and_(Job.id == oldest_queued, Job.status == "queued"))
+            .values(
+                status="running",
+                locked_by=claim_token,
+                lease_expires_at=now + timedelta(seconds=settings.job_lease_seconds),
+                started_at=now,
+                attempts=Job.attempts + 1
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+        if result.rowcount != 1:
+            return None
+
+        claimed = await session.execute(select(Job).where(Job.locked_by == claim_token))
+        return claimed.scalar_one_or_none()
+
+
+async def complete_job(job: Job, result: dict) -> None:
+    """Mark a claimed job as completed"""
+    async with async_session() as session:
+        await session.execute(
+            update(Job)
+            .where(and_(Job.id == job.id, Job.locked_by == job.locked_by))
+            .values(
+                status="completed",
+                result=json.dumps(result, default=str),
+                error=None,
+                lease_expires_at=None,
+                finished_at=datetime.utcnow()
+            )
+        )
+        await session.commit()
+
+
+async def fail_job(job: Job, error: str) -> None:
+    """Requeue a failed job, or mark it failed once it is out of attempts"""
+    retry = job.attempts < settings.job_max_attempts
+    async with async_session() as session:
+        await session.execute(
+            update(Job)
+            .where(and_(Job.id == job.id, Job.locked_by == job.locked_by))
+            .values(
+                status="queued" if retry else "failed",
+                error=error,
+                locked_by=None,
+                lease_expires_at=None,
+                finished_at=None if retry else datetime.utcnow()
+            )
+        )
+        await session.commit()
+
+
+async def renew_leases(claim_tokens: Set[str]) -> int:
+    """Extend the leases of the running jobs held under `claim_tokens`"""
+    if not claim_tokens:
+        return 0
+    async with async_session() as session:
+        renewed = await session.execute(
+            update(Job)
+            .where(and_(Job.status == "running", Job.locked_by.in_(claim_tokens)))
+            .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=settings.job_lease_seconds))
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        return renewed.rowcount
+
+
+async def release_jobs(claim_tokens: Set[str]) -> None:
+    """Put jobs held by this process back on the queue (used on shutdown)"""
+    if not claim_tokens:
+        return
+    async with async_session() as session:
+        await session.execute(
+            update(Job)
+            .where(and_(Job.status == "running", Job.locked_by.in_(claim_tokens)))
+            .values(
+                status="queued",
+                locked_by=None,
+                lease_expires_at=None,
+                attempts=Job.attempts - 1
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+
+async def recover_expired_jobs() -> int:
+    """Requeue running jobs whose worker died without finishing them"""
+    now = datetime.utcnow()
+    expired = and_(Job.status == "running", Job.lease_expires_at < now)
+
+    async with async_session() as session:
+        requeued = await session.execute(
+            update(Job)
+            .where(and_(expired, Job.attempts < settings.job_max_attempts))
+            .values(status="queued", locked_by=None, lease_expires_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        await session.execute(
+            update(Job)
+            .where(expired)
+            .values(
+                status="failed",
+                error="Job lease expired",
+                lease_expires_at=None,
+                finished_at=now
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        return requeued.rowcount
+
+
+class JobWorkerPool:
+    """In-process workers that drain the persistent job queue"""
+
+    def __init__(self, workers: int, poll_interval: float, lease_seconds: int):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self._tasks: list = []
+        self._wakeup = asyncio.Event()
+        self._active_claims: Set[str] = set()
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._run_worker(index))
+            for index in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._maintain_leases()))
+        print(f"🧵 Started {self.workers} job workers ({WORKER_ID})")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await release_jobs(self._active_claims)
+        self._active_claims.clear()
+
+    def notify(self) -> None:
+        """Wake idle workers so a freshly submitted job starts immediately"""
+        self._wakeup.set()
+
+    async def _wait_for_work(self) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _maintain_leases(self) -> None:
+        """
+        Renew the leases of this process's running jobs three times per
+        lease period, and requeue expired jobs of other processes once per
+        period (the lifespan already did it at startup).
+        """
+        loop = asyncio.get_running_loop()
+        last_recovery = loop.time()
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await renew_leases(set(self._active_claims))
+                if loop.time() - last_recovery >= self.lease_seconds:
+                    last_recovery = loop.time()
+                    if await recover_expired_jobs():
+                        self.notify()
+            except Exception as e:
+                print(f"❌ Failed to maintain job leases: {e}")
+
+    async def _run_worker(self, index: int) -> None:
+        while True:
+            try:
+                job = await claim_next_job()
+            except Exception as e:
+                print(f"❌ Job worker {index} failed to claim a job: {e}")
+                job = None
+
+            if job is None:
+                await self._wait_for_work()
+                continue
+
+            self._active_claims.add(job.locked_by)
+            print(f"📋 Worker {index} running job {job.id} for {job.company_domain}")
+            try:
+                # Loaded on first use so the job API does not pull in the agent stack
+                agent = await load_agent()
+                result = await agent.run_sdr_agent(
+                    job.company_domain,
+                    refresh_research=bool(job.refresh_research),
+                    bypass_llm_cache=bool(job.bypass_llm_cache)
+                )
+                await complete_job(job, result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Job {job.id} failed: {e}")
+                await fail_job(job, str(e))
+            self._active_claims.discard(job.locked_by)
+
+
+job_pool = JobWorkerPool(
+    workers=settings.job_workers,
+    poll_interval=settings.job_poll_interval,
+    lease_seconds=settings.job_lease_seconds
+)
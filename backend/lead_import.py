@@ -0,0 +1,249 @@
+"""
+Streaming import of prospect lists (CSV or NDJSON) into the leads table.
+
+The request body is consumed chunk by chunk, decoded and split into records
+incrementally, and valid rows are written in batched upserts, so memory use
+depends on the batch size rather than the file size.
+"""
+import codecs
+import csv
+import json
+import re
+from typing import AsyncIterator, Dict, List, Optional
+
+from database import async_session
+from domains import normalize_domain
+from leads import bulk_upsert_leads
+
+# Column names accepted for each lead field
+FIELD_ALIASES = {
+    "company_domain": ("company_domain", "domain", "website", "url"),
+    "company_name": ("company_name", "name", "company"),
+    "industry": ("industry",),
+    "description": ("description",),
+}
+
+_HOSTNAME = re.compile(r"^(?=.{1,253}$)([a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z]{2,63}$")
+
+
+class ImportFormatError(ValueError):
+    """The upload cannot be parsed at all (as opposed to a bad row)"""
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        if len(pending) > max_line_bytes:
+            raise ImportFormatError(f"Line longer than {max_line_bytes} characters")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+class _NeedMoreInput(Exception):
+    """The csv reader ran past the buffered lines in the middle of a record"""
+
+
+class _RecordFeed:
+    """
+    Input of the upload's csv.reader: the lines of the record being parsed.
+    The reader cannot suspend mid-record, so when it runs past the buffered
+    lines it raises _NeedMoreInput and the record is replayed from its first
+    line once the next line has arrived.
+    """
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self.size = 0
+        self.position = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if self.position == len(self.lines):
+            raise _NeedMoreInput
+        self.position += 1
+        return self.lines[self.position - 1]
+
+    def add(self, line: str) -> None:
+        # The newline is kept so quoted fields spanning lines keep theirs
+        self.lines.append(line + "\n")
+        self.size += len(line) + 1
+        self.position = 0
+
+    def clear(self) -> None:
+        self.lines = []
+        self.size = 0
+
+
+async def _iter_csv_records(lines: AsyncIterator[str], max_line_bytes: int):
+    """
+    Yield each CSV record as a list of fields, or an error message for a
+    record the csv module rejects. Quoting is left entirely to csv.reader,
+    so a stray quote inside an unquoted field is taken literally.
+    """
+    feed = _RecordFeed()
+    reader = csv.reader(feed)
+    async for line in lines:
+        if not feed.lines and not line.strip():
+            continue
+        feed.add(line)
+        if feed.size > max_line_bytes:
+            raise ImportFormatError(f"Record longer than {max_line_bytes} characters")
+        try:
+            record = next(reader)
+        except _NeedMoreInput:
+            continue
+        except csv.Error as e:
+            record = f"Invalid CSV: {e}"
+        feed.clear()
+        yield record
+    if feed.lines:
+        # Only a quoted field that is never closed leaves lines behind
+        yield "Invalid CSV: unterminated quoted field"
+
+
+def _column_map(header: List[str]) -> Dict[str, int]:
+    names = [name.strip().lower() for name in header]
+    columns = {}
+    for field, aliases in FIELD_ALIASES.items():
+        for alias in aliases:
+            if alias in names:
+                columns[field] = names.index(alias)
+                break
+    if "company_domain" not in columns:
+        raise ImportFormatError("CSV header must include a company_domain (or domain) column")
+    return columns
+
+
+async def _iter_rows(chunks: AsyncIterator[bytes], fmt: str, max_line_bytes: int):
+    """Yield (row_number, raw_dict_or_error) for each record in the upload"""
+    lines = _iter_lines(chunks, max_line_bytes)
+
+    if fmt == "ndjson":
+        row_number = 0
+        async for line in lines:
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                value = json.loads(line)
+            except ValueError as e:
+                yield row_number, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(value, dict):
+                yield row_number, "Each line must be a JSON object"
+                continue
+            yield row_number, {
+                field: next((value[alias] for alias in aliases if alias in value), None)
+                for field, aliases in FIELD_ALIASES.items()
+            }
+        return
+
+    columns: Optional[Dict[str, int]] = None
+    row_number = 0
+    async for record in _iter_csv_records(lines, max_line_bytes):
+        if columns is None:
+            if isinstance(record, str):
+                raise ImportFormatError(f"Cannot read the CSV header: {record}")
+            columns = _column_map(record)
+            continue
+        row_number += 1
+        if isinstance(record, str):
+            yield row_number, record
+            continue
+        yield row_number, {
+            field: record[index] if index < len(record) else None
+            for field, index in columns.items()
+        }
+
+
+def _validate(raw: dict) -> dict:
+    """Normalize a parsed row into lead data, raising ValueError when invalid"""
+    domain = normalize_domain(str(raw.get("company_domain") or ""))
+    if not domain:
+        raise ValueError("Missing company_domain")
+    if not _HOSTNAME.match(domain):
+        raise ValueError(f"Invalid domain: {raw.get('company_domain')}")
+
+    company_name = str(raw.get("company_name") or "").strip()
+    return {
+        "company_domain": domain,
+        "company_name": company_name or domain.split(".")[0].title(),
+        "industry": str(raw.get("industry") or "").strip(),
+        "description": str(raw.get("description") or "").strip(),
+        "research_summary": ""
+    }
+
+
+async def import_leads(
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    batch_size: int,
+    max_errors: int,
+    max_line_bytes: int
+) -> dict:
+    """
+    Parse, validate and upsert an uploaded lead list; return a summary.
+    An ImportFormatError before any batch was committed propagates. After
+    that, the rows read so far are committed and the summary reports the
+    error as `aborted`, with `last_row` the last row that was processed.
+    """
+    summary = {
+        "rows": 0,
+        "imported": 0,
+        "created": 0,
+        "updated": 0,
+        "failed": 0,
+        "batches": 0,
+        "errors": [],
+        "errors_truncated": False,
+        "aborted": None,
+        "last_row": 0
+    }
+    batch: List[dict] = []
+
+    async def flush():
+        async with async_session() as session:
+            counts = await bulk_upsert_leads(session, batch, chunk_size=batch_size)
+            await session.commit()
+        summary["created"] += counts["created"]
+        summary["updated"] += counts["updated"]
+        summary["imported"] += len(batch)
+        summary["batches"] += 1
+        batch.clear()
+
+    try:
+        async for row_number, raw in _iter_rows(chunks, fmt, max_line_bytes):
+            summary["rows"] += 1
+            summary["last_row"] = row_number
+            try:
+                if isinstance(raw, str):
+                    raise ValueError(raw)
+                batch.append(_validate(raw))
+            except ValueError as e:
+                summary["failed"] += 1
+                if len(summary["errors"]) < max_errors:
+                    summary["errors"].append({"row": row_number, "error": str(e)})
+                else:
+                    summary["errors_truncated"] = True
+                continue
+
+            if len(batch) >= batch_size:
+                await flush()
+    except ImportFormatError as e:
+        if summary["batches"] == 0:
+            raise
+        summary["aborted"] = str(e)
+
+    if batch:
+        await flush()
+
+    return summary
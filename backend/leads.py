@@ -0,0 +1,119 @@
+"""
+Write paths for leads.
+
+Leads are written with a native INSERT ... ON CONFLICT(company_domain) DO
+UPDATE ... RETURNING statement (SQLite and PostgreSQL), which takes one round
+trip and cannot race on the unique index the way select-then-insert does.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import Lead, record_change
+
+LEAD_FIELDS = ("company_name", "industry", "description", "research_summary")
+
+_DIALECT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def _upsert_statement(dialect_name: str):
+    insert = _DIALECT_INSERTS.get(dialect_name)
+    if insert is None:
+        raise ValueError(f"Lead upserts are not supported on {dialect_name}")
+
+    leads = Lead.__table__
+    statement = insert(leads)
+    statement = statement.on_conflict_do_update(
+        index_elements=[leads.c.company_domain],
+        set_={
+            # An empty incoming value keeps what is stored, so a bare domain
+            # list never wipes existing research
+            **{
+                field: func.coalesce(func.nullif(statement.excluded[field], ""), leads.c[field])
+                for field in LEAD_FIELDS
+            },
+            "updated_at": statement.excluded.updated_at
+        }
+    )
+    return statement.returning(
+        leads.c.id, leads.c.company_domain, leads.c.company_name, leads.c.created_at
+    )
+
+
+def _lead_row(data: dict, now: datetime) -> dict:
+    row = {"company_domain": data["company_domain"], "created_at": now, "updated_at": now}
+    for field in LEAD_FIELDS:
+        row[field] = data.get(field, "")
+    return row
+
+
+async def upsert_leads(session: AsyncSession, leads: Iterable[dict]) -> Dict[str, dict]:
+    """
+    Create or update several leads with one multi-row statement; results
+    are keyed by company_domain. Later rows win when a domain repeats.
+    """
+    now = datetime.utcnow()
+    dialect_name = session.get_bind().dialect.name
+    rows = {data["company_domain"]: _lead_row(data, now) for data in leads}
+    if not rows:
+        return {}
+    result = await session.execute(_upsert_statement(dialect_name), list(rows.values()))
+    await record_change(session, "leads")
+    return {
+        lead.company_domain: {
+            # created_at is left alone on conflict, so it only matches for new rows
+            "status": "created" if lead.created_at == now else "updated",
+            "lead_id": lead.id,
+            "company_domain": lead.company_domain,
+            "company_name": lead.company_name
+        }
+        for lead in result
+    }
+
+
+async def bulk_upsert_leads(
+    session: AsyncSession,
+    leads: Iterable[dict],
+    chunk_size: int = 1000,
+    now: Optional[datetime] = None
+) -> Dict[str, int]:
+    """
+    Upsert many leads with one statement per chunk. Later rows win when a
+    domain repeats. The caller owns the transaction.
+    """
+    now = now or datetime.utcnow()
+    dialect_name = session.get_bind().dialect.name
+    counts = {"created": 0, "updated": 0}
+
+    chunk: Dict[str, dict] = {}
+    for data in leads:
+        chunk[data["company_domain"]] = _lead_row(data, now)
+        if len(chunk) >= chunk_size:
+            await _write_chunk(session, dialect_name, chunk, now, counts)
+            chunk = {}
+    if chunk:
+        await _write_chunk(session, dialect_name, chunk, now, counts)
+    if counts["created"] or counts["updated"]:
+        await record_change(session, "leads")
+
+    return counts
+
+
+async def _write_chunk(
+    session: AsyncSession,
+    dialect_name: str,
+    chunk: Dict[str, dict],
+    now: datetime,
+    counts: Dict[str, int]
+) -> None:
+    # Executed as one batched multi-row statement (insertmanyvalues). A row can
+    # only be touched once per ON CONFLICT statement, hence the per-domain dict
+    result = await session.execute(_upsert_statement(dialect_name), list(chunk.values()))
+    for lead in result:
+        counts["created" if lead.created_at == now else "updated"] += 1
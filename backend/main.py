@@ -1,13 +1,34 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, ORJSONResponse
 from pydantic import BaseModel
 from typing import List, Optional
-from sqlalchemy import select
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from contextlib import asynccontextmanager
-
-from database import init_db, get_db, Lead, Email
-from agent import run_sdr_agent
+from datetime import datetime, timedelta
+import asyncio
+import json
+
+from database import init_db, get_db, record_change, Lead, Email
+from jobs import enqueue_job, get_job, recover_expired_jobs, job_pool
+from cache import research_cache, llm_cache
+from singleflight import agent_flights
+from lead_import import import_leads, ImportFormatError
+from exports import stream_export, resolve_columns, EXPORT_FORMATS
+from conditional import make_validators, collection_state, collection_versions
+from search import search_leads, SearchUnavailableError
+from metrics import MetricsMiddleware, render_metrics
+from crm_writer import crm_writer
+from tracing import trace_writer, purge_old_traces, slowest_runs, node_percentiles
+from pagination import encode_cursor, apply_keyset
+from agent_loader import load_agent, load_agent_now, warm_up_agent, agent_loaded, preload_mode
+from config import get_settings
+
+settings = get_settings()
+
+if preload_mode() == "eager":
+    load_agent_now()
 
 
 @asynccontextmanager
@@ -15,7 +36,18 @@ async def lifespan(app: FastAPI):
     # Initialize database on startup
     await init_db()
     print("Database initialized")
+    await research_cache.purge_expired()
+    await recover_expired_jobs()
+    await purge_old_traces()
+    job_pool.start()
+    # The CRM API serves right away; the agent stack loads in the background
+    warm_up = asyncio.create_task(warm_up_agent()) if preload_mode() == "background" else None
     yield
+    await job_pool.stop()
+    if warm_up is not None:
+        await asyncio.gather(warm_up, return_exceptions=True)
+    await crm_writer.stop()
+    await trace_writer.stop()
     print("Shutting down")
 
 
@@ -33,34 +65,96 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
 )
+app.add_middleware(MetricsMiddleware)
 
 
 # Request/Response Models
 class ResearchRequest(BaseModel):
     company_domain: str
+    refresh_research: bool = False
+    bypass_llm_cache: bool = False
+
+
+class StreamResearchRequest(ResearchRequest):
+    stream_tokens: bool = True
 
 
 class ResearchResponse(BaseModel):
+    run_id: Optional[str] = None
     company_domain: str
     research: dict
     lead: dict
     email: dict
+    llm_cache_hit: bool = False
     status: str
 
 
-class LeadResponse(BaseModel):
+class BatchResearchRequest(BaseModel):
+    company_domains: List[str]
+    concurrency: Optional[int] = None
+    refresh_research: bool = False
+    bypass_llm_cache: bool = False
+
+
+class BatchResearchItem(BaseModel):
+    company_domain: str
+    status: str
+    result: Optional[ResearchResponse]
+    error: Optional[str]
+
+
+class BatchResearchResponse(BaseModel):
+    total: int
+    completed: int
+    failed: int
+    results: List[BatchResearchItem]
+
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: str
+
+
+class JobResponse(BaseModel):
+    job_id: str
+    company_domain: str
+    status: str
+    attempts: int
+    result: Optional[ResearchResponse]
+    error: Optional[str]
+    created_at: str
+    started_at: Optional[str]
+    finished_at: Optional[str]
+
+
+class LeadImportError(BaseModel):
+    row: int
+    error: str
+
+
+class LeadImportResponse(BaseModel):
+    rows: int
+    imported: int
+    created: int
+    updated: int
+    failed: int
+    batches: int
+    errors: List[LeadImportError]
+    errors_truncated: bool
+    aborted: Optional[str] = None
+    last_row: int
+
+
+class LeadSearchResult(BaseModel):
     id: int
     company_domain: str
-    company_name: str
+    company_name: Optional[str]
     industry: Optional[str]
-    description: Optional[str]
-    research_summary: Optional[str]
     created_at: str
-    updated_at: str
-
-    class Config:
-        from_attributes = True
+    score: float
+    snippet: Optional[str]
 
 
 class EmailResponse(BaseModel):
@@ -76,6 +170,49 @@ class EmailResponse(BaseModel):
         from_attributes = True
 
 
+class LeadResponse(BaseModel):
+    id: int
+    company_domain: str
+    company_name: str
+    industry: Optional[str]
+    description: Optional[str]
+    research_summary: Optional[str]
+    created_at: str
+    updated_at: str
+    # Only present when requested with ?include=
+    emails: Optional[List[EmailResponse]] = None
+    latest_email: Optional[EmailResponse] = None
+
+    class Config:
+        from_attributes = True
+
+
+class EmailListItem(BaseModel):
+    """A row of GET /api/emails; ?fields= leaves out the columns not selected"""
+    id: Optional[int] = None
+    lead_id: Optional[int] = None
+    subject: Optional[str] = None
+    body: Optional[str] = None
+    status: Optional[str] = None
+    created_at: Optional[str] = None
+    sent_at: Optional[str] = None
+
+
+class LeadListItem(BaseModel):
+    """A row of GET /api/leads; ?fields= leaves out the columns not selected"""
+    id: Optional[int] = None
+    company_domain: Optional[str] = None
+    company_name: Optional[str] = None
+    industry: Optional[str] = None
+    description: Optional[str] = None
+    research_summary: Optional[str] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    # Only present when requested with ?include=
+    emails: Optional[List[EmailResponse]] = None
+    latest_email: Optional[EmailResponse] = None
+
+
 # Routes
 @app.get("/")
 async def root():
@@ -84,6 +221,9 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "research": "/api/research",
+            "research_batch": "/api/research/batch",
+            "research_stream": "/api/research/stream",
+            "jobs": "/api/jobs",
             "leads": "/api/leads",
             "emails": "/api/emails"
         }
@@ -101,48 +241,443 @@ async def research_company(request: ResearchRequest):
     4. Mock-send the email
     """
     try:
-        result = await run_sdr_agent(request.company_domain)
+        agent = await load_agent()
+        result = await agent.run_sdr_agent(
+            request.company_domain,
+            refresh_research=request.refresh_research,
+            bypass_llm_cache=request.bypass_llm_cache
+        )
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/leads", response_model=List[LeadResponse])
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.post("/api/research/stream")
+async def research_company_stream(request: StreamResearchRequest):
+    """
+    Streaming variant of /api/research.
+    Emits a Server-Sent Event as each workflow node (research, save_to_crm,
+    generate_email, send_email) finishes, carrying that node's partial state,
+    then a final `complete` event with the same payload /api/research returns.
+    With stream_tokens (the default), `email_token` events carry subject/body
+    text deltas as the LLM generates them; the `generate_email` event that
+    follows holds the final email after cleanup (greeting, signature).
+    The lead is written together with the email, so the `save_to_crm` event
+    carries a lead with status "staged" and no lead_id; the `send_email`
+    event carries the saved lead with its id and created/updated status.
+    """
+    async def event_stream():
+        try:
+            agent = await load_agent()
+            async for node, data in agent.stream_sdr_agent(
+                request.company_domain,
+                stream_tokens=request.stream_tokens,
+                refresh_research=request.refresh_research,
+                bypass_llm_cache=request.bypass_llm_cache
+            ):
+                yield _sse_event(node, data)
+        except Exception as e:
+            yield _sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/api/research/batch", response_model=BatchResearchResponse)
+async def research_companies_batch(request: BatchResearchRequest):
+    """
+    Run the SDR workflow for a list of company domains.
+    Domains are processed concurrently up to the requested limit (capped by
+    BATCH_MAX_CONCURRENCY); a failing domain is reported in its own entry
+    and does not abort the rest of the batch.
+    """
+    domains = [domain.strip() for domain in request.company_domains if domain.strip()]
+    if not domains:
+        raise HTTPException(status_code=400, detail="No company domains provided")
+    if len(domains) > settings.batch_max_domains:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds {settings.batch_max_domains} domains"
+        )
+
+    concurrency = request.concurrency or settings.batch_max_concurrency
+    if concurrency < 1:
+        raise HTTPException(status_code=400, detail="Concurrency must be at least 1")
+    concurrency = min(concurrency, settings.batch_max_concurrency)
+
+    agent = await load_agent()
+    results = await agent.run_sdr_agent_batch(
+        domains,
+        concurrency,
+        refresh_research=request.refresh_research,
+        bypass_llm_cache=request.bypass_llm_cache
+    )
+    completed = sum(1 for item in results if item["status"] == "completed")
+
+    return {
+        "total": len(results),
+        "completed": completed,
+        "failed": len(results) - completed,
+        "results": results
+    }
+
+
+@app.post("/api/jobs", response_model=JobSubmitResponse, status_code=202)
+async def submit_research_job(request: ResearchRequest):
+    """
+    Queue an SDR workflow run and return immediately.
+    Poll GET /api/jobs/{job_id} for its status and result.
+    """
+    job = await enqueue_job(
+        request.company_domain,
+        refresh_research=request.refresh_research,
+        bypass_llm_cache=request.bypass_llm_cache
+    )
+    job_pool.notify()
+    return {"job_id": job.id, "status": job.status}
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobResponse)
+async def get_research_job(job_id: str):
+    """Get the status and result of a queued research job"""
+    job = await get_job(job_id)
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return JobResponse(
+        job_id=job.id,
+        company_domain=job.company_domain,
+        status=job.status,
+        attempts=job.attempts,
+        result=json.loads(job.result) if job.result else None,
+        error=job.error,
+        created_at=str(job.created_at),
+        started_at=str(job.started_at) if job.started_at else None,
+        finished_at=str(job.finished_at) if job.finished_at else None
+    )
+
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Hit/miss counters for the research and LLM response caches and run coalescing"""
+    return {
+        "research": research_cache.stats(),
+        "llm": llm_cache.stats(),
+        "single_flight": agent_flights.stats()
+    }
+
+
+@app.get("/api/llm/stats")
+async def get_llm_stats():
+    """Rate limiter queue depth/wait times and hedging counters"""
+    if not agent_loaded():
+        # Nothing has been rate limited yet; don't pay for the import here
+        return {"agent_loaded": False, "rate_limiter": None, "hedging": None}
+    agent = await load_agent()
+    return {
+        "agent_loaded": True,
+        "rate_limiter": agent.llm_limiter.stats(),
+        "hedging": agent.llm_hedging.stats()
+    }
+
+
+@app.get("/api/runs/profile")
+async def get_run_profile(
+    window_minutes: int = Query(60, ge=1, le=60 * 24 * 30),
+    limit: int = Query(10, ge=1, le=100)
+):
+    """
+    Slowest agent runs (with per-node spans) and per-node latency
+    percentiles over the last `window_minutes`
+    """
+    since = datetime.utcnow() - timedelta(minutes=window_minutes)
+    return {
+        "window_minutes": window_minutes,
+        "slowest_runs": await slowest_runs(since, limit),
+        "nodes": await node_percentiles(since),
+        "writer": trace_writer.stats()
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+def _paginate(query, model, skip: int, limit: int, cursor: Optional[str]):
+    """
+    Newest-first page of `model`. With a cursor the page is found by keyset
+    (constant cost at any depth); skip is kept for backward compatibility.
+    """
+    query = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit)
+    if cursor:
+        try:
+            return apply_keyset(query, model, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return query.offset(skip)
+
+
+def _set_next_cursor(response: Response, rows: list, limit: int) -> None:
+    if rows and len(rows) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+
+def _latest(timestamps) -> Optional[datetime]:
+    return max((timestamp for timestamp in timestamps if timestamp is not None), default=None)
+
+
+def _select_fields(model, fields: Optional[str]) -> List[str]:
+    try:
+        return resolve_columns(model, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _projected_query(model, columns: List[str]):
+    """SELECT only `columns`, plus the keyset columns the cursor needs"""
+    table = model.__table__
+    names = list(dict.fromkeys([*columns, "created_at", "id"]))
+    return select(*[table.c[name] for name in names])
+
+
+def _row_dict(row, columns: List[str]) -> dict:
+    # Timestamps keep the str() format the response models have always used
+    mapping = row._mapping
+    return {
+        name: str(value) if isinstance(value, datetime) else value
+        for name, value in ((name, mapping[name]) for name in columns)
+    }
+
+
+def _list_response(items: list, rows: list, limit: int) -> ORJSONResponse:
+    """
+    Serialize plain dicts with orjson instead of validating a Pydantic model
+    per row; list pages can be thousands of rows.
+    """
+    response = ORJSONResponse(items)
+    _set_next_cursor(response, rows, limit)
+    return response
+
+
+LEAD_INCLUDES = {"emails", "latest_email"}
+EMAIL_COLUMNS = [column.name for column in Email.__table__.columns]
+
+
+async def _load_lead_emails(db: AsyncSession, lead_ids: List[int], latest_only: bool) -> dict:
+    """Fetch the emails of a whole page of leads in one query, grouped by lead"""
+    emails = Email.__table__
+    query = select(emails).where(emails.c.lead_id.in_(lead_ids))
+    if latest_only:
+        # One row per lead, picked in SQL rather than by loading every email
+        ranked = select(
+            emails.c.id,
+            func.row_number().over(
+                partition_by=emails.c.lead_id,
+                order_by=(emails.c.created_at.desc(), emails.c.id.desc())
+            ).label("rank")
+        ).where(emails.c.lead_id.in_(lead_ids)).subquery()
+        query = select(emails).join(ranked, emails.c.id == ranked.c.id).where(ranked.c.rank == 1)
+    
+    result = await db.execute(query.order_by(emails.c.created_at.desc(), emails.c.id.desc()))
+    grouped: dict = {lead_id: [] for lead_id in lead_ids}
+    for row in result:
+        grouped[row.lead_id].append(_row_dict(row, EMAIL_COLUMNS))
+    return grouped
+
+
+@app.get("/api/leads", response_model=List[LeadListItem])
 async def get_leads(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    include: Optional[str] = None,
+    fields: Optional[str] = None,
     db: AsyncSession = Depends(get_db)
 ):
-    """Get all leads from CRM"""
+    """
+    Get all leads from CRM, newest first.
+    Pass the X-Next-Cursor response header back as `cursor` for the next page.
+    `include=emails` nests every email of each lead and `include=latest_email`
+    only the most recent one; both are loaded for the whole page in one query.
+    `fields=id,company_name,...` returns (and selects) only those columns.
+    Supports If-None-Match / If-Modified-Since.
+    """
+    includes = {item.strip() for item in include.split(",") if item.strip()} if include else set()
+    if includes - LEAD_INCLUDES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"include supports: {', '.join(sorted(LEAD_INCLUDES))}"
+        )
+    columns = _select_fields(Lead, fields)
+    
+    state = await collection_versions(db, *(("leads", "emails") if includes else ("leads",)))
+    validators = make_validators(
+        "leads", state, _latest(changed_at for _, changed_at in state), request.url.query
+    )
+    if validators.matches(request):
+        return validators.not_modified()
+    
     result = await db.execute(
-        select(Lead).offset(skip).limit(limit).order_by(Lead.created_at.desc())
+        _paginate(_projected_query(Lead, columns), Lead, skip, limit, cursor)
     )
-    leads = result.scalars().all()
+    rows = result.all()
+    leads = [_row_dict(row, columns) for row in rows]
     
-    return [
-        LeadResponse(
-            id=lead.id,
-            company_domain=lead.company_domain,
-            company_name=lead.company_name,
-            industry=lead.industry,
-            description=lead.description,
-            research_summary=lead.research_summary,
-            created_at=str(lead.created_at),
-            updated_at=str(lead.updated_at)
+    if includes and rows:
+        emails_by_lead = await _load_lead_emails(
+            db,
+            [row.id for row in rows],
+            latest_only="emails" not in includes
         )
-        for lead in leads
-    ]
+        for lead, row in zip(leads, rows):
+            lead_emails = emails_by_lead[row.id]
+            if "emails" in includes:
+                lead["emails"] = lead_emails
+            if "latest_email" in includes:
+                lead["latest_email"] = lead_emails[0] if lead_emails else None
+    
+    return validators.apply(_list_response(leads, rows, limit))
+
+
+@app.post("/api/leads/import", response_model=LeadImportResponse)
+async def import_leads_file(
+    request: Request,
+    fmt: Optional[str] = Query(None, alias="format")
+):
+    """
+    Bulk-import leads from a raw CSV or NDJSON request body.
+    The body is streamed and parsed incrementally; valid rows are upserted in
+    batches and invalid ones are reported with their row number. The format
+    comes from ?format=csv|ndjson or the Content-Type header. An upload that
+    turns unreadable after batches were committed returns the summary with
+    `aborted` set; rows after `last_row` were not imported.
+    """
+    if fmt is None:
+        content_type = request.headers.get("content-type", "")
+        fmt = "ndjson" if "json" in content_type else "csv"
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+    
+    try:
+        return await import_leads(
+            request.stream(),
+            fmt,
+            batch_size=settings.lead_import_batch_size,
+            max_errors=settings.lead_import_max_errors,
+            max_line_bytes=settings.lead_import_max_line_bytes
+        )
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _export_response(
+    model,
+    name: str,
+    fmt: str,
+    columns: Optional[str],
+    created_after: Optional[datetime],
+    created_before: Optional[datetime]
+) -> StreamingResponse:
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    try:
+        selected = resolve_columns(model, columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return StreamingResponse(
+        stream_export(
+            model,
+            selected,
+            fmt,
+            created_after=created_after,
+            created_before=created_before,
+            chunk_size=settings.export_chunk_size
+        ),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'}
+    )
+
+
+@app.get("/api/leads/search", response_model=List[LeadSearchResult])
+async def search_leads_endpoint(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Full-text search over lead name, industry, description and research.
+    Every word must match; results are ranked best first (lower score is
+    better) with a <mark>-highlighted snippet.
+    """
+    try:
+        return await search_leads(db, q, limit=limit, offset=offset)
+    except SearchUnavailableError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+
+@app.get("/api/leads/export")
+async def export_leads(
+    fmt: str = Query("ndjson", alias="format"),
+    columns: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None
+):
+    """
+    Stream every lead as NDJSON or CSV straight from a database cursor.
+    `columns` is a comma-separated list; created_after/created_before filter
+    on created_at.
+    """
+    return _export_response(Lead, "leads", fmt, columns, created_after, created_before)
+
+
+@app.get("/api/emails/export")
+async def export_emails(
+    fmt: str = Query("ndjson", alias="format"),
+    columns: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None
+):
+    """Stream every email as NDJSON or CSV straight from a database cursor"""
+    return _export_response(Email, "emails", fmt, columns, created_after, created_before)
 
 
 @app.get("/api/leads/{lead_id}", response_model=LeadResponse)
-async def get_lead(lead_id: int, db: AsyncSession = Depends(get_db)):
-    """Get a specific lead by ID"""
+async def get_lead(
+    lead_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a specific lead by ID. Supports If-None-Match / If-Modified-Since."""
+    updated_at = await db.scalar(select(Lead.updated_at).where(Lead.id == lead_id))
+    if updated_at is None:
+        raise HTTPException(status_code=404, detail="Lead not found")
+    
+    validators = make_validators("lead", (lead_id, updated_at), updated_at)
+    if validators.matches(request):
+        return validators.not_modified()
+    
     result = await db.execute(select(Lead).where(Lead.id == lead_id))
     lead = result.scalar_one_or_none()
     
     if not lead:
         raise HTTPException(status_code=404, detail="Lead not found")
     
+    validators.apply(response)
     return LeadResponse(
         id=lead.id,
         company_domain=lead.company_domain,
@@ -155,40 +690,59 @@ async def get_lead(lead_id: int, db: AsyncSession = Depends(get_db)):
     )
 
 
-@app.get("/api/emails", response_model=List[EmailResponse])
+@app.get("/api/emails", response_model=List[EmailListItem])
 async def get_emails(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     db: AsyncSession = Depends(get_db)
 ):
-    """Get all emails"""
+    """
+    Get all emails, newest first.
+    Pass the X-Next-Cursor response header back as `cursor` for the next page.
+    `fields=id,subject,...` returns (and selects) only those columns.
+    Supports If-None-Match / If-Modified-Since.
+    """
+    columns = _select_fields(Email, fields)
+    
+    state = await collection_versions(db, "emails")
+    validators = make_validators("emails", state, state[0][1], request.url.query)
+    if validators.matches(request):
+        return validators.not_modified()
+    
     result = await db.execute(
-        select(Email).offset(skip).limit(limit).order_by(Email.created_at.desc())
+        _paginate(_projected_query(Email, columns), Email, skip, limit, cursor)
     )
-    emails = result.scalars().all()
+    rows = result.all()
     
-    return [
-        EmailResponse(
-            id=email.id,
-            lead_id=email.lead_id,
-            subject=email.subject,
-            body=email.body,
-            status=email.status,
-            created_at=str(email.created_at),
-            sent_at=str(email.sent_at) if email.sent_at else None
-        )
-        for email in emails
-    ]
+    return validators.apply(
+        _list_response([_row_dict(row, columns) for row in rows], rows, limit)
+    )
 
 
 @app.get("/api/leads/{lead_id}/emails", response_model=List[EmailResponse])
-async def get_lead_emails(lead_id: int, db: AsyncSession = Depends(get_db)):
-    """Get all emails for a specific lead"""
+async def get_lead_emails(
+    lead_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get all emails for a specific lead. Supports If-None-Match / If-Modified-Since."""
+    state = await collection_state(db, Email, Email.created_at, Email.lead_id == lead_id)
+    validators = make_validators("lead_emails", (lead_id, *state), state[2])
+    if validators.matches(request):
+        return validators.not_modified()
+    
     result = await db.execute(
-        select(Email).where(Email.lead_id == lead_id).order_by(Email.created_at.desc())
+        select(Email)
+        .where(Email.lead_id == lead_id)
+        .order_by(Email.created_at.desc(), Email.id.desc())
     )
     emails = result.scalars().all()
     
+    validators.apply(response)
     return [
         EmailResponse(
             id=email.id,
@@ -213,6 +767,7 @@ async def delete_lead(lead_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Lead not found")
     
     await db.delete(lead)
+    await record_change(db, "leads")
     await db.commit()
     
     return {"status": "deleted", "lead_id": lead_id}
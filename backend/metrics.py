@@ -0,0 +1,172 @@
+"""
+Prometheus metrics for the API, the agent graph, the LLM and the database.
+
+Metric children are bound to their labels up front where the label set is
+known, so recording on the hot path is a lock-protected float add (about a
+microsecond). Exposed in the text format at GET /metrics.
+
+With several uvicorn workers each process keeps its own registry; run one
+worker per scrape target or use prometheus_client's multiprocess mode.
+"""
+import functools
+import time
+from typing import Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from sqlalchemy import event
+
+# Agent runs are dominated by the LLM call, so buckets reach up to a minute
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000)
+
+NODE_DURATION = Histogram(
+    "sdr_agent_node_duration_seconds",
+    "Time spent in each agent graph node",
+    ["node"],
+    buckets=LATENCY_BUCKETS
+)
+NODE_ERRORS = Counter(
+    "sdr_agent_node_errors_total",
+    "Agent graph node invocations that raised",
+    ["node"]
+)
+DB_QUERY_DURATION = Histogram(
+    "sdr_db_query_duration_seconds",
+    "Database statement execution time by statement type",
+    ["operation"],
+    buckets=QUERY_BUCKETS
+)
+LLM_REQUEST_DURATION = Histogram(
+    "sdr_llm_request_duration_seconds",
+    "Email generation LLM latency, including rate-limit queueing and hedging",
+    ["mode"],
+    buckets=LATENCY_BUCKETS
+)
+LLM_REQUESTS = Counter(
+    "sdr_llm_requests_total",
+    "Email generation attempts by outcome",
+    ["outcome"]
+)
+LLM_TOKENS = Histogram(
+    "sdr_llm_tokens",
+    "Tokens per email generation call",
+    ["direction"],
+    buckets=TOKEN_BUCKETS
+)
+EMAIL_FALLBACKS = Counter(
+    "sdr_email_fallbacks_total",
+    "Emails that fell back to the template",
+    ["reason"]
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "sdr_http_request_duration_seconds",
+    "HTTP request latency until the response completes",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+CRM_WRITE_BATCH_SIZE = Histogram(
+    "sdr_crm_write_batch_size",
+    "Agent run writes committed per CRM writer transaction",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500)
+)
+CRM_WRITE_DURATION = Histogram(
+    "sdr_crm_write_batch_duration_seconds",
+    "Time to write and commit one CRM writer batch",
+    buckets=QUERY_BUCKETS
+)
+
+_INPUT_TOKENS = LLM_TOKENS.labels(direction="input")
+_OUTPUT_TOKENS = LLM_TOKENS.labels(direction="output")
+_QUERY_DURATIONS = {}
+
+
+def instrument_node(name: str, node):
+    """Wrap an async graph node so each call records its latency"""
+    duration = NODE_DURATION.labels(node=name)
+    errors = NODE_ERRORS.labels(node=name)
+
+    # functools.wraps keeps the signature LangGraph inspects for config/writer
+    @functools.wraps(node)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await node(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            duration.observe(time.perf_counter() - started)
+
+    return wrapper
+
+
+def observe_llm_call(mode: str, seconds: float, usage: Optional[dict]) -> None:
+    LLM_REQUEST_DURATION.labels(mode=mode).observe(seconds)
+    if usage:
+        _INPUT_TOKENS.observe(usage.get("input_tokens", 0))
+        _OUTPUT_TOKENS.observe(usage.get("output_tokens", 0))
+
+
+def instrument_engine(engine) -> None:
+    """Time every statement on `engine` through cursor execute events"""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        operation = statement.lstrip()[:6].upper()
+        histogram = _QUERY_DURATIONS.get(operation)
+        if histogram is None:
+            histogram = DB_QUERY_DURATION.labels(operation=operation.strip() or "OTHER")
+            _QUERY_DURATIONS[operation] = histogram
+        histogram.observe(time.perf_counter() - started)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        # A failed statement never reaches after_cursor_execute
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency per method, route template and status"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the scope; the template
+            # keeps path parameters out of the label set
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status)
+            ).observe(time.perf_counter() - started)
+
+
+def render_metrics() -> tuple:
+    """(body, content type) for the /metrics endpoint"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,34 @@
+"""
+Opaque keyset cursors for list endpoints.
+
+A cursor encodes the (created_at, id) of the last row of a page; the next
+page continues strictly after it in (created_at DESC, id DESC) order, which
+the composite indexes serve directly at any depth.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    payload = json.dumps([created_at.isoformat(), row_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Raise ValueError for anything that is not a cursor we issued"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def apply_keyset(query, model, cursor: str):
+    """Order newest first and continue after `cursor`"""
+    created_at, row_id = decode_cursor(cursor)
+    return query.where(tuple_(model.created_at, model.id) < (created_at, row_id))
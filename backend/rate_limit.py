@@ -0,0 +1,222 @@
+"""
+Process-wide rate limiting for Anthropic calls.
+
+Callers queue in FIFO order for a slot that satisfies both a requests-per-minute
+and a tokens-per-minute token bucket, plus an adaptive concurrency limit.
+Rate-limit and overload errors are retried with jittered exponential backoff
+and halve the concurrency limit; successes grow it back one slot at a time
+(AIMD), so throughput settles just under the provider limit.
+"""
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+RETRYABLE_STATUS_CODES = (429, 503, 529)
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """True for provider rate-limit and overload errors"""
+    status_code = getattr(error, "status_code", None)
+    if status_code in RETRYABLE_STATUS_CODES:
+        return True
+    name = type(error).__name__
+    return "RateLimit" in name or "Overloaded" in name
+
+
+class TokenBucket:
+    """Continuously refilled bucket; the level may go negative to record debt"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self.level -= amount
+
+
+class LLMRateLimiter:
+    """Fair queue in front of the LLM with RPM/TPM buckets and AIMD concurrency"""
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        max_concurrency: int,
+        min_concurrency: int,
+        max_retries: int,
+        retry_base_delay: float,
+        retry_max_delay: float
+    ):
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency_limit = float(max_concurrency)
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+
+        # asyncio.Lock wakes waiters in FIFO order, which gives fair queueing
+        self._lock = asyncio.Lock()
+        self._slot_freed = asyncio.Event()
+        self._last_decrease = 0.0
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait for a concurrency slot and enough request/token budget"""
+        enqueued = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    if self.in_flight >= max(1, int(self.concurrency_limit)):
+                        self._slot_freed.clear()
+                        await self._slot_freed.wait()
+                        continue
+                    self._requests.refill()
+                    self._tokens.refill()
+                    delay = max(self._requests.wait_time(1), self._tokens.wait_time(tokens))
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                        continue
+                    self._requests.consume(1)
+                    self._tokens.consume(tokens)
+                    self.in_flight += 1
+                    break
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - enqueued
+        self.requests += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+    def release(self, throttled: Optional[bool]) -> None:
+        """
+        Free a slot and adjust concurrency: throttled=True halves the limit,
+        False adds 1/limit (one slot per window of successes), None leaves it.
+        """
+        self.in_flight -= 1
+        self._slot_freed.set()
+
+        if throttled:
+            self.throttled += 1
+            now = time.monotonic()
+            # Decrease at most once per second so one burst of 429s counts once
+            if now - self._last_decrease >= 1.0:
+                self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit / 2)
+                self._last_decrease = now
+        elif throttled is False:
+            self.concurrency_limit = min(
+                self.max_concurrency,
+                self.concurrency_limit + 1 / max(self.concurrency_limit, 1.0)
+            )
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct the token bucket once real usage is known"""
+        self._tokens.consume(actual_tokens - estimated_tokens)
+
+    @asynccontextmanager
+    async def limit(self, tokens: int):
+        """Hold one rate-limited slot for the duration of the block"""
+        await self.acquire(tokens)
+        throttled: Optional[bool] = None
+        try:
+            yield
+            throttled = False
+        except Exception as e:
+            throttled = True if is_retryable_error(e) else None
+            raise
+        finally:
+            self.release(throttled)
+
+    async def run(self, call: Callable[[], Awaitable[Any]], tokens: int) -> Any:
+        """Run `call` under the limiter, retrying rate-limit/overload errors"""
+        attempt = 0
+        while True:
+            try:
+                async with self.limit(tokens):
+                    result = await call()
+            except Exception as e:
+                if not is_retryable_error(e) or attempt >= self.max_retries:
+                    raise
+                await self._backoff(attempt)
+                attempt += 1
+                continue
+
+            usage = getattr(result, "usage_metadata", None)
+            if usage:
+                self.settle(tokens, usage.get("total_tokens", tokens))
+            return result
+
+    async def stream(
+        self,
+        open_stream: Callable[[], AsyncIterator[Any]],
+        tokens: int
+    ) -> AsyncIterator[Any]:
+        """
+        Yield the chunks of a streamed call under the limiter. Errors raised
+        before the first chunk are retried like run(); after that a failure
+        is final, since the chunks already yielded cannot be taken back.
+        """
+        attempt = 0
+        while True:
+            streaming = False
+            usage = None
+            try:
+                async with self.limit(tokens):
+                    async for chunk in open_stream():
+                        streaming = True
+                        usage = getattr(chunk, "usage_metadata", None) or usage
+                        yield chunk
+            except Exception as e:
+                if streaming or not is_retryable_error(e) or attempt >= self.max_retries:
+                    raise
+                await self._backoff(attempt)
+                attempt += 1
+                continue
+
+            if usage:
+                self.settle(tokens, usage.get("total_tokens", tokens))
+            return
+
+    async def _backoff(self, attempt: int) -> None:
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt)
+        self.retries += 1
+        await asyncio.sleep(random.uniform(delay / 2, delay))
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.waiting,
+            "in_flight": self.in_flight,
+            "concurrency_limit": round(self.concurrency_limit, 2),
+            "requests": self.requests,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "avg_wait_seconds": self.total_wait / self.requests if self.requests else 0.0,
+            "max_wait_seconds": self.max_wait,
+            "request_budget": round(self._requests.level, 2),
+            "token_budget": round(self._tokens.level, 2)
+        }
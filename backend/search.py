@@ -0,0 +1,142 @@
+"""
+Full-text search over leads with SQLite FTS5.
+
+`leads_fts` is an external-content FTS5 table over the leads table: it holds
+only the inverted index, and triggers on `leads` keep it in step with every
+write path (ORM, upserts, bulk import, delete). Matches are ranked with BM25,
+weighting the company name above industry, description and research.
+"""
+import re
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+SEARCH_COLUMNS = ("company_name", "industry", "description", "research_summary")
+# BM25 weights, in SEARCH_COLUMNS order
+RANK_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+
+_COLUMNS = ", ".join(SEARCH_COLUMNS)
+_NEW_VALUES = ", ".join(f"new.{column}" for column in SEARCH_COLUMNS)
+_OLD_VALUES = ", ".join(f"old.{column}" for column in SEARCH_COLUMNS)
+
+_TRIGGERS = {
+    "leads_fts_insert": f"""
+        CREATE TRIGGER leads_fts_insert AFTER INSERT ON leads BEGIN
+            INSERT INTO leads_fts(rowid, {_COLUMNS}) VALUES (new.id, {_NEW_VALUES});
+        END
+    """,
+    "leads_fts_delete": f"""
+        CREATE TRIGGER leads_fts_delete AFTER DELETE ON leads BEGIN
+            INSERT INTO leads_fts(leads_fts, rowid, {_COLUMNS})
+            VALUES ('delete', old.id, {_OLD_VALUES});
+        END
+    """,
+    "leads_fts_update": f"""
+        CREATE TRIGGER leads_fts_update AFTER UPDATE OF {_COLUMNS} ON leads BEGIN
+            INSERT INTO leads_fts(leads_fts, rowid, {_COLUMNS})
+            VALUES ('delete', old.id, {_OLD_VALUES});
+            INSERT INTO leads_fts(rowid, {_COLUMNS}) VALUES (new.id, {_NEW_VALUES});
+        END
+    """,
+}
+
+_SEARCH_QUERY = text(f"""
+    SELECT
+        leads.id,
+        leads.company_domain,
+        leads.company_name,
+        leads.industry,
+        leads.created_at,
+        leads_fts.rank AS score,
+        snippet(leads_fts, -1, :mark_start, :mark_end, '…', :snippet_tokens) AS snippet
+    FROM leads_fts
+    JOIN leads ON leads.id = leads_fts.rowid
+    WHERE leads_fts MATCH :query
+    ORDER BY leads_fts.rank
+    LIMIT :limit OFFSET :offset
+""")
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+class SearchUnavailableError(RuntimeError):
+    """The configured database has no FTS5 index"""
+
+
+def create_search_index(connection) -> None:
+    """Create the FTS5 table and triggers (SQLite only), backfilling once"""
+    if connection.dialect.name != "sqlite":
+        return
+
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'leads_fts'")
+    ).first()
+    if not exists:
+        connection.execute(text(f"""
+            CREATE VIRTUAL TABLE leads_fts USING fts5(
+                {_COLUMNS},
+                content='leads',
+                content_rowid='id',
+                tokenize='porter unicode61'
+            )
+        """))
+        weights = ", ".join(str(weight) for weight in RANK_WEIGHTS)
+        connection.execute(text(
+            f"INSERT INTO leads_fts(leads_fts, rank) VALUES ('rank', 'bm25({weights})')"
+        ))
+        # Index leads written before search existed
+        connection.execute(text("INSERT INTO leads_fts(leads_fts) VALUES ('rebuild')"))
+
+    for name, ddl in _TRIGGERS.items():
+        found = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = :name"),
+            {"name": name}
+        ).first()
+        if not found:
+            connection.execute(text(ddl))
+
+
+def build_match_query(q: str) -> str:
+    """
+    Turn free text into an FTS5 query that matches every word. Terms are
+    quoted, so user input can never be parsed as FTS5 syntax.
+    """
+    return " ".join(f'"{term}"' for term in _TERM.findall(q))
+
+
+async def search_leads(
+    session: AsyncSession,
+    q: str,
+    limit: int = 20,
+    offset: int = 0,
+    snippet_tokens: int = 16
+) -> List[dict]:
+    """Best-ranked leads matching all words of `q`, with a highlighted snippet"""
+    if session.get_bind().dialect.name != "sqlite":
+        raise SearchUnavailableError("Lead search requires SQLite FTS5")
+
+    query = build_match_query(q)
+    if not query:
+        return []
+
+    result = await session.execute(_SEARCH_QUERY, {
+        "query": query,
+        "mark_start": "<mark>",
+        "mark_end": "</mark>",
+        "snippet_tokens": snippet_tokens,
+        "limit": limit,
+        "offset": offset
+    })
+    return [
+        {
+            "id": row.id,
+            "company_domain": row.company_domain,
+            "company_name": row.company_name,
+            "industry": row.industry,
+            "created_at": str(row.created_at),
+            "score": row.score,
+            "snippet": row.snippet
+        }
+        for row in result
+    ]
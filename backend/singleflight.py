@@ -0,0 +1,192 @@
+"""
+Single-flight execution of agent runs.
+
+Concurrent callers asking for the same key share one execution and all
+receive its result (or its exception). Within a process this is a map of
+in-flight tasks; across processes it is optionally backed by a lease row in
+the `agent_run_leases` table, renewed while the run lasts, where the
+finished result is published for callers in other workers. Finished rows
+are kept for a short grace period so those callers can read the result,
+then deleted.
+"""
+import asyncio
+import json
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import delete, update, and_, or_
+from sqlalchemy.exc import IntegrityError
+
+from database import AgentRunLease, async_session
+from config import get_settings
+
+settings = get_settings()
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key onto one task"""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[dict]]) -> dict:
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            # The shared work runs in its own task so that a caller going away
+            # (e.g. a client disconnect) does not cancel it for the others.
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved when every caller has gone away
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._inflight),
+            "executions": self.executions,
+            "coalesced": self.coalesced
+        }
+
+
+async def _try_acquire(key: str, owner: str) -> Tuple[bool, Optional[str]]:
+    """Take the lease for `key`; return (acquired, current_owner)"""
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=settings.single_flight_lease_seconds)
+
+    async with async_session() as session:
+        taken = await session.execute(
+            update(AgentRunLease)
+            .where(and_(
+                AgentRunLease.flight_key == key,
+                or_(AgentRunLease.status != "running", AgentRunLease.expires_at < now)
+            ))
+            .values(owner=owner, status="running", result=None, error=None, expires_at=expires_at)
+        )
+        if taken.rowcount == 1:
+            await session.commit()
+            return True, owner
+
+        session.add(AgentRunLease(
+            flight_key=key,
+            owner=owner,
+            status="running",
+            expires_at=expires_at
+        ))
+        try:
+            await session.commit()
+            return True, owner
+        except IntegrityError:
+            await session.rollback()
+
+        lease = await session.get(AgentRunLease, key)
+        return False, lease.owner if lease else None
+
+
+async def _wait_for_owner(key: str, owner: Optional[str]) -> Optional[dict]:
+    """
+    Poll until the run held by `owner` finishes and return its result.
+    Returns None when the lease is gone, expired or taken over, in which
+    case the caller should try to acquire it again.
+    """
+    while True:
+        await asyncio.sleep(settings.single_flight_poll_interval)
+        async with async_session() as session:
+            lease = await session.get(AgentRunLease, key)
+
+        if lease is None or lease.owner != owner:
+            return None
+        if lease.status == "completed":
+            return json.loads(lease.result)
+        if lease.status == "failed":
+            raise RuntimeError(lease.error or "Agent run failed in another worker")
+        if lease.expires_at < datetime.utcnow():
+            return None
+
+
+async def _renew(key: str, owner: str) -> None:
+    """Push the lease's expiry forward while its run is in progress"""
+    interval = settings.single_flight_lease_seconds / 3
+    while True:
+        await asyncio.sleep(interval)
+        expires_at = datetime.utcnow() + timedelta(seconds=settings.single_flight_lease_seconds)
+        try:
+            async with async_session() as session:
+                await session.execute(
+                    update(AgentRunLease)
+                    .where(and_(
+                        AgentRunLease.flight_key == key,
+                        AgentRunLease.owner == owner,
+                        AgentRunLease.status == "running"
+                    ))
+                    .values(expires_at=expires_at)
+                )
+                await session.commit()
+        except Exception as e:
+            # The next renewal retries; the lease is good for two more intervals
+            print(f"❌ Failed to renew lease for {key}: {e}")
+
+
+async def _release(key: str, owner: str, result: Optional[dict], error: Optional[str]) -> None:
+    now = datetime.utcnow()
+    async with async_session() as session:
+        # Waiters poll for the outcome until expires_at; after that the row
+        # is only taking up space and the next release deletes it
+        await session.execute(
+            update(AgentRunLease)
+            .where(and_(AgentRunLease.flight_key == key, AgentRunLease.owner == owner))
+            .values(
+                status="failed" if error is not None else "completed",
+                result=json.dumps(result, default=str) if result is not None else None,
+                error=error,
+                expires_at=now + timedelta(seconds=settings.single_flight_result_grace_seconds)
+            )
+        )
+        await session.execute(
+            delete(AgentRunLease)
+            .where(and_(AgentRunLease.status != "running", AgentRunLease.expires_at < now))
+        )
+        await session.commit()
+
+
+async def run_with_lease(key: str, fn: Callable[[], Awaitable[dict]]) -> dict:
+    """Run `fn` unless another process already runs `key`, then share its result"""
+    owner = f"{WORKER_ID}:{uuid.uuid4().hex}"
+
+    while True:
+        acquired, holder = await _try_acquire(key, owner)
+        if acquired:
+            break
+        result = await _wait_for_owner(key, holder)
+        if result is not None:
+            return result
+
+    # Renewals only touch a running lease, so one racing the release is harmless
+    renewal = asyncio.create_task(_renew(key, owner))
+    try:
+        result = await fn()
+    except Exception as e:
+        await _release(key, owner, None, str(e))
+        raise
+    finally:
+        renewal.cancel()
+    await _release(key, owner, result, None)
+    return result
+
+
+agent_flights = SingleFlight()
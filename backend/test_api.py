@@ -96,6 +96,29 @@ async def test_get_emails():
             return False
 
 
+async def test_import_stray_quote():
+    """A literal quote inside an unquoted CSV field must not swallow later rows"""
+    print("\nTesting lead import with a stray quote...")
+    body = 'domain,name\nstray-quote-a.com,Acme 5" screens\nstray-quote-b.com,Foo\n'
+    async with httpx.AsyncClient() as client:
+        try:
+            response = await client.post(
+                f"{API_URL}/api/leads/import",
+                params={"format": "csv"},
+                content=body.encode()
+            )
+            summary = response.json()
+            if response.status_code == 200 and summary["imported"] == 2 and not summary["failed"]:
+                print("✅ Both rows imported")
+                return True
+            else:
+                print(f"❌ Unexpected import result: {response.status_code} {summary}")
+                return False
+        except Exception as e:
+            print(f"❌ Import error: {e}")
+            return False
+
+
 async def run_all_tests():
     """Run all tests"""
     print("=" * 60)
@@ -117,6 +140,9 @@ async def run_all_tests():
     # Test 4: Get emails
     await test_get_emails()
     
+    # Test 5: CSV import with a stray quote
+    await test_import_stray_quote()
+    
     print("\n" + "=" * 60)
     print("Test suite completed!")
     print("=" * 60)
@@ -1,17 +1,22 @@
 from langchain.tools import BaseTool
-from typing import Optional, Type, Dict, Any
+from typing import Optional, Type, Dict, Any, Tuple
 from pydantic import BaseModel, Field
+import copy
 import httpx
 import json
 from datetime import datetime
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
-from database import Lead, Email, async_session
+from database import Email, UnitOfWork
+from cache import research_cache
+from crm_writer import crm_writer
+from config import get_settings
+
+settings = get_settings()
 
 
 # Research Tool Schema
 class ResearchToolInput(BaseModel):
     company_domain: str = Field(description="The company domain to research (e.g., openai.com)")
+    refresh: bool = Field(default=False, description="Ignore cached research and search again")
 
 
 class ResearchTool(BaseTool):
@@ -23,9 +28,21 @@ class ResearchTool(BaseTool):
     """
     args_schema: Type[BaseModel] = ResearchToolInput
     
-    async def _arun(self, company_domain: str) -> str:
+    async def _arun(self, company_domain: str, refresh: bool = False) -> str:
         """Research a company using web search"""
+        research_data, _ = await self.research(company_domain, refresh)
+        return json.dumps(research_data, indent=2)
+    
+    async def research(self, company_domain: str, refresh: bool = False) -> Tuple[Dict[str, Any], bool]:
+        """Research a company; returns (research data, whether it came from the cache)"""
         try:
+            use_cache = settings.research_cache_enabled
+            if use_cache and not refresh:
+                cached = await research_cache.get(company_domain)
+                if cached is not None:
+                    # The memory tier hands out its own dict; callers get a copy
+                    return copy.deepcopy(cached), True
+            
             # Use a simple web search (in production, use Tavily or similar)
             search_query = f"{company_domain} company about products services"
             
@@ -33,11 +50,14 @@ class ResearchTool(BaseTool):
             # In production, integrate with Tavily API or similar
             research_data = await self._perform_search(company_domain, search_query)
             
-            return json.dumps(research_data, indent=2)
+            if use_cache:
+                await research_cache.set(company_domain, research_data)
+            
+            return research_data, False
         except Exception as e:
-            return json.dumps({"error": str(e)})
+            return {"error": str(e)}, False
     
-    def _run(self, company_domain: str) -> str:
+    def _run(self, company_domain: str, refresh: bool = False) -> str:
         """Sync version (not used in async context)"""
         raise NotImplementedError("Use async version")
     
@@ -115,14 +135,11 @@ class CRMTool(BaseTool):
     """
     args_schema: Type[BaseModel] = CRMCreateLeadInput
     
-    async def _arun(self, **kwargs) -> str:
+    async def _arun(self, unit_of_work: Optional[UnitOfWork] = None, **kwargs) -> str:
         """Execute CRM operation"""
         try:
-            async with async_session() as session:
-                # Create or update lead
-                result = await self._create_or_update_lead(session, kwargs)
-                await session.commit()
-                return json.dumps(result, default=str)
+            result = await self._create_or_update_lead(kwargs, unit_of_work=unit_of_work)
+            return json.dumps(result, default=str)
         except Exception as e:
             return json.dumps({"error": str(e)})
     
@@ -130,48 +147,27 @@ class CRMTool(BaseTool):
         """Sync version (not used)"""
         raise NotImplementedError("Use async version")
     
-    async def _create_or_update_lead(self, session: AsyncSession, data: dict) -> dict:
-        """Create or update a lead in the database"""
-        company_domain = data.get("company_domain")
-        
-        # Check if lead exists
-        result = await session.execute(
-            select(Lead).where(Lead.company_domain == company_domain)
-        )
-        existing_lead = result.scalar_one_or_none()
-        
-        if existing_lead:
-            # Update existing lead
-            existing_lead.company_name = data.get("company_name", existing_lead.company_name)
-            existing_lead.industry = data.get("industry", existing_lead.industry)
-            existing_lead.description = data.get("description", existing_lead.description)
-            existing_lead.research_summary = data.get("research_summary", existing_lead.research_summary)
-            existing_lead.updated_at = datetime.utcnow()
-            
+    async def _create_or_update_lead(
+        self,
+        data: dict,
+        unit_of_work: Optional[UnitOfWork] = None
+    ) -> dict:
+        """
+        Create or update a lead with a single upsert, committed by the CRM
+        writer. Inside a unit of work the lead is only staged; it is written
+        (and gets its id) together with the run's email.
+        """
+        if unit_of_work is not None:
+            unit_of_work.pending_lead = dict(data)
             return {
-                "status": "updated",
-                "lead_id": existing_lead.id,
-                "company_domain": existing_lead.company_domain,
-                "company_name": existing_lead.company_name
-            }
-        else:
-            # Create new lead
-            new_lead = Lead(
-                company_domain=company_domain,
-                company_name=data.get("company_name", ""),
-                industry=data.get("industry", ""),
-                description=data.get("description", ""),
-                research_summary=data.get("research_summary", "")
-            )
-            session.add(new_lead)
-            await session.flush()
-            
-            return {
-                "status": "created",
-                "lead_id": new_lead.id,
-                "company_domain": new_lead.company_domain,
-                "company_name": new_lead.company_name
+                "status": "staged",
+                "lead_id": None,
+                "company_domain": data.get("company_domain"),
+                "company_name": data.get("company_name", "")
             }
+        
+        written = await crm_writer.write(lead=data)
+        return written["lead"]
 
 
 class EmailToolInput(BaseModel):
@@ -189,29 +185,45 @@ class EmailTool(BaseTool):
     """
     args_schema: Type[BaseModel] = EmailToolInput
     
-    async def _arun(self, lead_id: int, subject: str, body: str) -> str:
+    async def _arun(
+        self,
+        lead_id: Optional[int],
+        subject: str,
+        body: str,
+        unit_of_work: Optional[UnitOfWork] = None
+    ) -> str:
         """Save email to CRM"""
         try:
-            async with async_session() as session:
-                email = Email(
-                    lead_id=lead_id,
-                    subject=subject,
-                    body=body,
-                    status="sent",
-                    sent_at=datetime.utcnow()
-                )
-                session.add(email)
-                await session.commit()
-                
-                return json.dumps({
-                    "status": "success",
-                    "email_id": email.id,
-                    "lead_id": lead_id,
-                    "sent_at": str(email.sent_at)
-                })
+            lead = None
+            if unit_of_work is not None and lead_id is None:
+                # The staged lead is written in the same transaction as the email
+                lead = unit_of_work.pending_lead
+            written = await crm_writer.write(lead=lead, email=self._build_email(lead_id, subject, body))
+            if unit_of_work is not None and written["lead"] is not None:
+                unit_of_work.lead_result = written["lead"]
+            return self._result(written["email"])
         except Exception as e:
             return json.dumps({"error": str(e)})
     
+    @staticmethod
+    def _build_email(lead_id: Optional[int], subject: str, body: str) -> dict:
+        return {
+            "lead_id": lead_id,
+            "subject": subject,
+            "body": body,
+            "status": "sent",
+            "sent_at": datetime.utcnow()
+        }
+    
+    @staticmethod
+    def _result(email: Email) -> str:
+        return json.dumps({
+            "status": "success",
+            "email_id": email.id,
+            "lead_id": email.lead_id,
+            "sent_at": str(email.sent_at)
+        })
+    
     def _run(self, lead_id: int, subject: str, body: str) -> str:
         """Sync version (not used)"""
         raise NotImplementedError("Use async version")
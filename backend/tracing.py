@@ -0,0 +1,320 @@
+"""
+Per-run execution traces for profiling slow agent runs.
+
+Each agent execution gets a RunTrace, carried in a context variable, so the
+graph nodes (which run in tasks copied from the run's context) can add spans
+without any plumbing. Finished traces are handed to TraceWriter, which
+inserts them in batches from a background task: the request path only does
+a non-blocking queue put, and a full queue drops traces rather than waiting.
+"""
+import asyncio
+import contextvars
+import functools
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import case, delete, func, insert, select
+
+from database import AgentRun, AgentRunSpan, async_session
+from config import get_settings
+
+settings = get_settings()
+
+PERCENTILES = (50, 95, 99)
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("agent_run_trace", default=None)
+
+
+class RunTrace:
+    """Timings, token usage and errors collected during one agent run"""
+
+    def __init__(self, company_domain: str):
+        self.run_id = uuid.uuid4().hex
+        self.company_domain = company_domain
+        self.started_at = datetime.utcnow()
+        self._started = time.perf_counter()
+        self.spans: List[dict] = []
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.llm_cache_hit = False
+        self.research_cache_hit = False
+
+    def add_span(self, node: str, started: float, finished: float, error: Optional[str]) -> None:
+        # perf_counter offsets keep spans monotonic and cheap to record
+        self.spans.append({
+            "run_id": self.run_id,
+            "node": node,
+            "started_at": self.started_at + timedelta(seconds=started - self._started),
+            "finished_at": self.started_at + timedelta(seconds=finished - self._started),
+            "duration_ms": (finished - started) * 1000,
+            "error": error
+        })
+
+    def add_usage(self, usage: Optional[dict]) -> None:
+        if usage:
+            self.input_tokens += usage.get("input_tokens", 0)
+            self.output_tokens += usage.get("output_tokens", 0)
+
+    def finish(self, error: Optional[str] = None) -> dict:
+        duration = time.perf_counter() - self._started
+        return {
+            "id": self.run_id,
+            "company_domain": self.company_domain,
+            "status": "error" if error else "success",
+            "error": error,
+            "started_at": self.started_at,
+            "finished_at": self.started_at + timedelta(seconds=duration),
+            "duration_ms": duration * 1000,
+            "llm_cache_hit": self.llm_cache_hit,
+            "research_cache_hit": self.research_cache_hit,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens
+        }
+
+
+def current_trace() -> Optional[RunTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def traced_run(company_domain: str):
+    """
+    Trace the agent run executed inside the block, then hand the trace to
+    the background writer. Yields None when tracing is disabled.
+    """
+    if not settings.trace_enabled:
+        yield None
+        return
+
+    trace = RunTrace(company_domain)
+    token = _current_trace.set(trace)
+    error = None
+    try:
+        yield trace
+    except BaseException as e:
+        # Includes cancellation and a streaming client going away
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            # An async generator may be finalized from another context
+            pass
+        trace_writer.submit(trace, error)
+
+
+def trace_node(name: str, node):
+    """Wrap an async graph node so each call is recorded as a span"""
+
+    @functools.wraps(node)
+    async def wrapper(*args, **kwargs):
+        trace = _current_trace.get()
+        if trace is None:
+            return await node(*args, **kwargs)
+        started = time.perf_counter()
+        error = None
+        try:
+            return await node(*args, **kwargs)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            trace.add_span(name, started, time.perf_counter(), error)
+
+    return wrapper
+
+
+class TraceWriter:
+    """Batches finished traces into agent_runs/agent_run_spans inserts"""
+
+    def __init__(self, batch_size: int, flush_interval: float, queue_size: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def submit(self, trace: RunTrace, error: Optional[str] = None) -> None:
+        """Queue a finished trace; never blocks the caller"""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self.start()
+        try:
+            self._queue.put_nowait((trace.finish(error), trace.spans))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the writer after flushing whatever is queued"""
+        if self._task is None:
+            return
+        # None is the stop sentinel, queued behind every pending trace
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stopping = False
+            # Gather more for up to flush_interval so inserts are amortized
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._write(batch)
+            if stopping:
+                return
+
+    async def _write(self, batch: list) -> None:
+        if not batch:
+            return
+        runs = [run for run, _ in batch]
+        spans = [span for _, run_spans in batch for span in run_spans]
+        try:
+            async with async_session() as session:
+                await session.execute(insert(AgentRun), runs)
+                if spans:
+                    await session.execute(insert(AgentRunSpan), spans)
+                await session.commit()
+            self.written += len(runs)
+        except Exception as e:
+            self.failed += len(runs)
+            print(f"❌ Failed to write {len(runs)} agent run traces: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "queued": self._queue.qsize() if self._queue is not None else 0
+        }
+
+
+trace_writer = TraceWriter(
+    batch_size=settings.trace_batch_size,
+    flush_interval=settings.trace_flush_interval,
+    queue_size=settings.trace_queue_size
+)
+
+
+async def purge_old_traces() -> int:
+    """Delete traces older than the retention window"""
+    cutoff = datetime.utcnow() - timedelta(days=settings.trace_retention_days)
+    async with async_session() as session:
+        old_runs = select(AgentRun.id).where(AgentRun.started_at < cutoff)
+        await session.execute(delete(AgentRunSpan).where(AgentRunSpan.run_id.in_(old_runs)))
+        result = await session.execute(delete(AgentRun).where(AgentRun.started_at < cutoff))
+        await session.commit()
+        return result.rowcount
+
+
+async def slowest_runs(since: datetime, limit: int) -> List[dict]:
+    """The slowest runs started since `since`, each with its node spans"""
+    async with async_session() as session:
+        result = await session.execute(
+            select(AgentRun)
+            .where(AgentRun.started_at >= since)
+            .order_by(AgentRun.duration_ms.desc())
+            .limit(limit)
+        )
+        runs = result.scalars().all()
+        spans_by_run = {run.id: [] for run in runs}
+        if runs:
+            spans = await session.execute(
+                select(AgentRunSpan)
+                .where(AgentRunSpan.run_id.in_(list(spans_by_run)))
+                .order_by(AgentRunSpan.started_at)
+            )
+            for span in spans.scalars():
+                spans_by_run[span.run_id].append({
+                    "node": span.node,
+                    "started_at": str(span.started_at),
+                    "duration_ms": round(span.duration_ms, 2),
+                    "error": span.error
+                })
+
+    return [
+        {
+            "run_id": run.id,
+            "company_domain": run.company_domain,
+            "status": run.status,
+            "error": run.error,
+            "started_at": str(run.started_at),
+            "duration_ms": round(run.duration_ms, 2),
+            "llm_cache_hit": run.llm_cache_hit,
+            "research_cache_hit": bool(run.research_cache_hit),
+            "input_tokens": run.input_tokens,
+            "output_tokens": run.output_tokens,
+            "spans": spans_by_run[run.id]
+        }
+        for run in runs
+    ]
+
+
+async def node_percentiles(since: datetime) -> dict:
+    """Per-node count, mean, max and nearest-rank p50/p95/p99 in milliseconds"""
+    window = AgentRunSpan.started_at >= since
+    ranked = select(
+        AgentRunSpan.node,
+        AgentRunSpan.duration_ms,
+        func.row_number().over(
+            partition_by=AgentRunSpan.node, order_by=AgentRunSpan.duration_ms
+        ).label("position"),
+        func.count().over(partition_by=AgentRunSpan.node).label("total")
+    ).where(window).subquery()
+
+    async with async_session() as session:
+        totals = await session.execute(
+            select(
+                AgentRunSpan.node,
+                func.count(),
+                func.avg(AgentRunSpan.duration_ms),
+                func.max(AgentRunSpan.duration_ms),
+                func.sum(case((AgentRunSpan.error.is_not(None), 1), else_=0))
+            ).where(window).group_by(AgentRunSpan.node)
+        )
+        nodes = {
+            node: {
+                "count": count,
+                "errors": errors or 0,
+                "mean_ms": round(mean, 2),
+                "max_ms": round(maximum, 2)
+            }
+            for node, count, mean, maximum, errors in totals
+        }
+
+        # Only the rows at each percentile's rank leave the database
+        for percentile in PERCENTILES:
+            rank = (ranked.c.total * percentile + 99) // 100
+            rows = await session.execute(
+                select(ranked.c.node, ranked.c.duration_ms).where(ranked.c.position == rank)
+            )
+            for node, duration in rows:
+                nodes[node][f"p{percentile}_ms"] = round(duration, 2)
+
+    return nodes
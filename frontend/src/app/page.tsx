@@ -37,6 +37,7 @@ interface Lead {
   research_summary?: string;
   created_at: string;
   updated_at?: string;
+  latest_email?: Email | null;
 }
 
 interface Email {
@@ -86,8 +87,16 @@ export default function Home() {
 
   const loadLeads = async () => {
     try {
-      const response = await axios.get<Lead[]>(`${API_URL}/api/leads`);
+      // The latest email comes embedded, so expanding a lead needs no extra request
+      const response = await axios.get<Lead[]>(`${API_URL}/api/leads`, {
+        params: { include: 'latest_email' },
+      });
       setLeads(response.data);
+      const emails: { [key: number]: Email[] } = {};
+      response.data.forEach((lead) => {
+        emails[lead.id] = lead.latest_email ? [lead.latest_email] : [];
+      });
+      setLeadEmails(emails);
     } catch (err: any) {
       console.error('Failed to load leads');
     }